@@ -0,0 +1,313 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import numpy as np
+import sklearn
+from generate_data import generate_dataset, write_dataset
+from generate_report import generate_pdf_report
+from instrumentation import latency_percentiles
+from loadgen import random_request
+from model_pack import PACK_FILE, compare_artifacts, pack_model
+from model_registry import MODEL_FILE, get_registry
+from predict import predict_disease, predict_disease_batch
+from replay import iter_requests
+from report_batch import sample_records
+from startup_profile import profile as profile_startup
+from train_model import _load_split, fit_and_measure
+from tree_compiler import source_stamp
+
+# Metrics compared against a baseline, by name suffix; anything else is informational
+HIGHER_IS_BETTER = ('_per_s', 'accuracy')
+LOWER_IS_BETTER = ('_ms', '_s', '_mb')
+# Differences of two latencies: near zero or negative, so a relative change is
+# noise and these are compared by absolute difference instead
+ABSOLUTE_MS = ('overhead_ms', 'overhead_ms_per_record')
+
+
+def load_replay(path):
+    """predict_disease_batch records from a JSONL request log.
+
+    Lines that are not requests with a 'symptoms' list (other event types, the
+    backlog format) are skipped.
+    """
+    return [record for _, _, record, _ in iter_requests(path) if record is not None]
+
+
+def random_records(n, seed=0):
+    rng = random.Random(seed)
+    return [random_request(rng) for _ in range(n)]
+
+
+def bench_predict(records, batch_sizes=(1, 8, 64, 256)):
+    """Cold model load, single-record latency and batch throughput, prediction cache off."""
+    registry = get_registry()
+    registry.invalidate()
+    start = time.perf_counter()
+    if registry.get() is None:
+        raise RuntimeError("Required model files not found. Please train the model first.")
+    results = {"model_load_s": time.perf_counter() - start}
+
+    def single(record):
+        return predict_disease(record['symptoms'], record.get('age', 25), record.get('gender', 'Male'),
+                               record.get('vitals'), record.get('history'), use_cache=False)
+
+    for record in records[:20]:
+        single(record)
+    latencies = []
+    start = time.perf_counter()
+    for record in records:
+        t = time.perf_counter()
+        single(record)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    results["single"] = {"requests": len(records), **latency_percentiles(latencies),
+                         "requests_per_s": len(records) / elapsed}
+
+    for size in batch_sizes:
+        batches = [records[i:i + size] for i in range(0, len(records) - size + 1, size)] or [records]
+        predict_disease_batch(batches[0], use_cache=False)
+        latencies = []
+        start = time.perf_counter()
+        for batch in batches:
+            t = time.perf_counter()
+            predict_disease_batch(batch, use_cache=False)
+            latencies.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - start
+        results[f"batch_{size}"] = {**latency_percentiles(latencies),
+                                    "records_per_s": sum(len(b) for b in batches) / elapsed}
+    return results
+
+
+def bench_explain(records, batch_sizes=(64, 256)):
+    """Latency of predictions with and without tree-path explanations, prediction cache off.
+
+    The two modes alternate call by call so drift affects both alike.
+    """
+    if get_registry().get() is None:
+        raise RuntimeError("Required model files not found. Please train the model first.")
+
+    def single(record, explain):
+        return predict_disease(record['symptoms'], record.get('age', 25), record.get('gender', 'Male'),
+                               record.get('vitals'), record.get('history'), use_cache=False, explain=explain)
+
+    results = {}
+    runs = [("single", [[record] for record in records], lambda batch, explain: single(batch[0], explain))]
+    for size in batch_sizes:
+        batches = [records[i:i + size] for i in range(0, len(records) - size + 1, size)] or [records]
+        runs.append((f"batch_{size}", batches,
+                     lambda batch, explain: predict_disease_batch(batch, use_cache=False, explain=explain)))
+    for name, batches, call in runs:
+        call(batches[0], True)
+        latencies = {False: [], True: []}
+        for batch in batches:
+            for explain in (False, True):
+                t = time.perf_counter()
+                call(batch, explain)
+                latencies[explain].append(time.perf_counter() - t)
+        plain, explained = latency_percentiles(latencies[False]), latency_percentiles(latencies[True])
+        results[name] = {
+            "plain": plain,
+            "explained": explained,
+            "overhead_ms": explained["p50_ms"] - plain["p50_ms"],
+            "overhead_ms_per_record": (explained["p50_ms"] - plain["p50_ms"]) / len(batches[0]),
+        }
+    return results
+
+
+def bench_train(samples_per_disease=300, backend='gb', seed=42):
+    """Wall time and memory of the fit train_model.train performs, on a fresh synthetic dataset.
+
+    Goes through fit_and_measure rather than train() so the installed model files
+    are left alone.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'disease_data.parquet')
+        generate_dataset(samples_per_disease, seed, compact=True).to_parquet(path, index=False)
+        start = time.perf_counter()
+        X_train, X_test, y_train, y_test, _ = _load_split(path)
+        load_s = time.perf_counter() - start
+    _, _, metrics = fit_and_measure(backend, X_train, X_test, y_train, y_test, trace_memory=True)
+    return {
+        "rows": len(X_train) + len(X_test),
+        "load_split_s": load_s,
+        "fit_s": metrics["fit_time_s"],
+        "fit_peak_mb": metrics["peak_memory_mb"],
+        "max_rss_mb": metrics["max_rss_mb"],
+        "accuracy": metrics["accuracy"],
+        "predict_row_ms": metrics["latency_ms_per_row"],
+    }
+
+
+def bench_generate_data(samples_per_disease=2000, write_rows=200_000, seed=42):
+    """In-memory generation and chunked Parquet writing rates."""
+    start = time.perf_counter()
+    df = generate_dataset(samples_per_disease, seed)
+    generate_s = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        write_dataset(os.path.join(tmp, 'disease_data.parquet'), write_rows, workers=1, seed=seed)
+        write_s = time.perf_counter() - start
+    return {
+        "generate_rows": len(df),
+        "generate_s": generate_s,
+        "generate_rows_per_s": len(df) / generate_s,
+        "write_rows": write_rows,
+        "write_s": write_s,
+        "write_rows_per_s": write_rows / write_s,
+    }
+
+
+def bench_reports(n=200, seed=0):
+    """generate_pdf_report into memory, one report at a time."""
+    records = list(sample_records(n, seed))
+    generate_pdf_report(*records[0], None)
+    latencies = []
+    start = time.perf_counter()
+    for record in records:
+        t = time.perf_counter()
+        generate_pdf_report(*record, None)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    return {"reports": n, **latency_percentiles(latencies), "reports_per_s": n / elapsed}
+
+
+def bench_artifact(repeat=3):
+    """Size and fresh-interpreter time to first prediction, joblib files vs model pack.
+
+    Packs the installed joblib model into a temporary file when no pack exists.
+    """
+    if os.path.exists(PACK_FILE):
+        return compare_artifacts(repeat=repeat)
+    bundle = get_registry().get()
+    if bundle is None or bundle.model is None:
+        raise RuntimeError("Required model files not found. Please train the model first.")
+    with tempfile.TemporaryDirectory() as tmp:
+        pack_path = pack_model(bundle.model, bundle.feature_names, bundle.scaler, os.path.join(tmp, PACK_FILE),
+                               source=source_stamp(MODEL_FILE))
+        return compare_artifacts(pack_path=pack_path, repeat=repeat)
+
+
+SUITES = ('predict', 'explain', 'train', 'data', 'report', 'artifact', 'startup')
+
+
+def run(suites=SUITES, records=None, quick=False):
+    records = records or random_records(200 if quick else 1000)
+    scale = 0.2 if quick else 1.0
+    results = {}
+    if 'predict' in suites:
+        results['predict'] = bench_predict(records)
+    if 'explain' in suites:
+        results['explain'] = bench_explain(records)
+    if 'train' in suites:
+        results['train'] = bench_train(int(300 * scale))
+    if 'data' in suites:
+        results['data'] = bench_generate_data(int(2000 * scale), int(200_000 * scale))
+    if 'report' in suites:
+        results['report'] = bench_reports(int(200 * scale))
+    if 'artifact' in suites:
+        results['artifact'] = bench_artifact(1 if quick else 3)
+    if 'startup' in suites:
+        results['startup'] = profile_startup(repeat=1 if quick else 3)
+    return {
+        "meta": {
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "sklearn": sklearn.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "replayed_requests": len(records),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+def _flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + '.'))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(current, baseline, tolerance=0.2, tolerance_ms=0.1):
+    """Metrics that got worse than `baseline` by more than `tolerance` (a fraction).
+
+    Overheads (ABSOLUTE_MS) are regressions when they grew by more than
+    `tolerance_ms` milliseconds, and are reported with worse_by_ms.
+    """
+    now = _flatten(current['results'])
+    before = _flatten(baseline['results'])
+    regressions = []
+    for name, value in now.items():
+        old = before.get(name)
+        if old is None:
+            continue
+        if name.endswith(ABSOLUTE_MS):
+            if value - old > tolerance_ms:
+                regressions.append({"metric": name, "baseline": old, "current": value, "worse_by_ms": value - old})
+            continue
+        if not old:
+            continue
+        if name.endswith(HIGHER_IS_BETTER):
+            change = (old - value) / old
+        elif name.endswith(LOWER_IS_BETTER):
+            change = (value - old) / old
+        else:
+            continue
+        if change > tolerance:
+            regressions.append({"metric": name, "baseline": old, "current": value, "worse_by": change})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark inference, training, data generation and reports")
+    parser.add_argument('--suites', nargs='+', choices=SUITES, default=list(SUITES))
+    parser.add_argument('--replay', help="JSONL request log to replay for the predict suite")
+    parser.add_argument('--quick', action='store_true', help="smaller workloads for a fast check")
+    parser.add_argument('--output', help="write results JSON here instead of stdout")
+    parser.add_argument('--baseline', help="results JSON to compare against; exit 1 on regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed slowdown vs the baseline (fraction)")
+    parser.add_argument('--tolerance-ms', type=float, default=0.1,
+                        help="allowed growth of overhead metrics vs the baseline (milliseconds)")
+    parser.add_argument('--save-baseline', help="also write the results to this path as the new baseline")
+    args = parser.parse_args(argv)
+
+    records = load_replay(args.replay) if args.replay else None
+    if args.replay and not records:
+        parser.error(f"no prediction requests found in {args.replay}")
+    results = run(args.suites, records, args.quick)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance, args.tolerance_ms)
+        for r in regressions:
+            worse = f"{r['worse_by_ms']:.3f}ms" if 'worse_by_ms' in r else f"{r['worse_by'] * 100:.0f}%"
+            print(f"REGRESSION {r['metric']}: {r['baseline']:.4g} -> {r['current']:.4g} ({worse} worse)",
+                  file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance * 100:.0f}% against {args.baseline}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,293 @@
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+import numpy as np
+from doctors_db import DOCTORS, DISEASE_KNOWLEDGE, FrozenRecord
+from instrumentation import latency_percentiles
+
+# Grid cell edge in degrees (~5.5km of latitude); nearest() widens its search square cell by cell
+CELL_DEG = 0.05
+KM_PER_DEG = 110.57
+EARTH_RADIUS_KM = 6371.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS doctors (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    specialty TEXT NOT NULL,
+    diseases TEXT NOT NULL,
+    location TEXT NOT NULL,
+    contact TEXT,
+    rating REAL NOT NULL,
+    latitude REAL,
+    longitude REAL
+);
+-- One row per (doctor, disease), with the columns the lookups filter and sort on copied in
+CREATE TABLE IF NOT EXISTS doctor_diseases (
+    disease TEXT NOT NULL,
+    specialty TEXT NOT NULL,
+    rating REAL NOT NULL,
+    doctor_id INTEGER NOT NULL REFERENCES doctors(id),
+    cell_x INTEGER,
+    cell_y INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_disease_rating ON doctor_diseases (disease, rating DESC, doctor_id);
+CREATE INDEX IF NOT EXISTS idx_disease_specialty ON doctor_diseases (disease, specialty, rating DESC, doctor_id);
+CREATE INDEX IF NOT EXISTS idx_disease_cell ON doctor_diseases (disease, cell_x, cell_y) WHERE cell_x IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_specialty ON doctors (specialty COLLATE NOCASE);
+"""
+
+COLUMNS = "d.name, d.specialty, d.diseases, d.location, d.contact, d.rating, d.latitude, d.longitude"
+
+
+def _cell(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None, None
+    return math.floor(longitude / CELL_DEG), math.floor(latitude / CELL_DEG)
+
+
+def _float_or_none(value):
+    return None if value in (None, '') else float(value)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class DoctorStore:
+    """SQLite-backed doctor directory with the same suggestions() API as DoctorIndex.
+
+    doctors_db.set_index(DoctorStore(path)) points get_suggestions at it. Each
+    thread gets its own connection. Doctors with coordinates are also bucketed
+    into a CELL_DEG grid for nearest().
+    """
+
+    def __init__(self, path='doctors.sqlite'):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM doctors").fetchone()[0]
+
+    def diseases(self):
+        return [row[0] for row in self._connect().execute("SELECT DISTINCT disease FROM doctor_diseases")]
+
+    def import_doctors(self, doctors, batch_rows=10_000):
+        """Append doctor dicts (DOCTORS-style, optional latitude/longitude) in one transaction."""
+        conn = self._connect()
+        next_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM doctors").fetchone()[0]
+        count = 0
+        with conn:
+            doctor_rows, disease_rows = [], []
+            for doc in doctors:
+                diseases = doc["diseases"]
+                if isinstance(diseases, str):
+                    diseases = [d.strip() for d in diseases.split(';') if d.strip()]
+                latitude = _float_or_none(doc.get("latitude"))
+                longitude = _float_or_none(doc.get("longitude"))
+                rating = float(doc["rating"])
+                cell_x, cell_y = _cell(latitude, longitude)
+                doctor_rows.append((next_id, doc["name"], doc["specialty"], ';'.join(diseases), doc["location"],
+                                    doc.get("contact"), rating, latitude, longitude))
+                specialty = doc["specialty"].casefold()
+                disease_rows.extend((disease, specialty, rating, next_id, cell_x, cell_y) for disease in diseases)
+                next_id += 1
+                count += 1
+                if len(doctor_rows) >= batch_rows:
+                    self._insert(conn, doctor_rows, disease_rows)
+                    doctor_rows, disease_rows = [], []
+            self._insert(conn, doctor_rows, disease_rows)
+        conn.execute("ANALYZE")
+        return count
+
+    @staticmethod
+    def _insert(conn, doctor_rows, disease_rows):
+        conn.executemany("INSERT INTO doctors VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", doctor_rows)
+        conn.executemany("INSERT INTO doctor_diseases VALUES (?, ?, ?, ?, ?, ?)", disease_rows)
+
+    def import_csv(self, path, batch_rows=10_000):
+        """Bulk-load a CSV with name, specialty, diseases (';'-separated), location,
+        contact, rating and optional latitude/longitude columns."""
+        with open(path, newline='', encoding='utf-8') as f:
+            return self.import_doctors(csv.DictReader(f), batch_rows)
+
+    @staticmethod
+    def _record(row, distance_km=None):
+        name, specialty, diseases, location, contact, rating, latitude, longitude = row[:8]
+        record = {
+            "name": name,
+            "specialty": specialty,
+            "diseases": tuple(diseases.split(';')),
+            "location": location,
+            "contact": contact,
+            "rating": rating,
+        }
+        if latitude is not None:
+            record["latitude"] = latitude
+            record["longitude"] = longitude
+        if distance_km is not None:
+            record["distance_km"] = round(distance_km, 2)
+        return FrozenRecord(record)
+
+    def suggestions(self, disease, location=None, specialty=None, top_k=None):
+        sql = f"SELECT {COLUMNS} FROM doctor_diseases dd JOIN doctors d ON d.id = dd.doctor_id WHERE dd.disease = ?"
+        params = [disease]
+        if specialty is not None:
+            sql += " AND dd.specialty = ?"
+            params.append(specialty.casefold())
+        if location is not None:
+            sql += " AND instr(lower(d.location), ?) > 0"
+            params.append(location.casefold())
+        sql += " ORDER BY dd.rating DESC, dd.doctor_id LIMIT ?"
+        params.append(-1 if top_k is None else top_k)
+        return [self._record(row) for row in self._connect().execute(sql, params)]
+
+    def nearest(self, disease, latitude, longitude, k=5, specialty=None, max_km=None):
+        """The `k` closest doctors treating `disease`, nearest first, with distance_km.
+
+        Searches a square of grid cells around the point, growing it until the
+        k-th candidate is closer than anything outside the square can be.
+        """
+        conn = self._connect()
+        qx, qy = _cell(latitude, longitude)
+        sql = (f"SELECT {COLUMNS} FROM doctor_diseases dd JOIN doctors d ON d.id = dd.doctor_id "
+               "WHERE dd.disease = ? AND dd.cell_x BETWEEN ? AND ? AND dd.cell_y BETWEEN ? AND ?")
+        if specialty is not None:
+            sql += " AND dd.specialty = ?"
+        max_radius = int(360 / CELL_DEG)
+        radius = 1
+        while True:
+            params = [disease, qx - radius, qx + radius, qy - radius, qy + radius]
+            if specialty is not None:
+                params.append(specialty.casefold())
+            rows = conn.execute(sql, params).fetchall()
+            # Anything outside the square is at least this far away
+            margin_deg = radius * CELL_DEG
+            edge_lat = min(89.9, abs(latitude) + margin_deg)
+            reach_km = margin_deg * KM_PER_DEG * math.cos(math.radians(edge_lat))
+            if rows:
+                distances = haversine_km(latitude, longitude,
+                                         np.array([row[6] for row in rows]), np.array([row[7] for row in rows]))
+                order = np.argsort(distances, kind='stable')[:k]
+                kth = distances[order[-1]]
+                done = (len(order) == k and kth <= reach_km) or (max_km is not None and reach_km >= max_km)
+            else:
+                done = max_km is not None and reach_km >= max_km
+            if done or radius >= max_radius:
+                break
+            radius *= 2
+
+        if not rows:
+            return []
+        return [self._record(rows[i], distances[i]) for i in order
+                if max_km is None or distances[i] <= max_km]
+
+
+def synthetic_doctors(n, seed=0, center=(40.73, -73.94), spread_deg=2.0):
+    """`n` random doctors reusing the built-in specialties and their disease lists."""
+    rng = random.Random(seed)
+    templates = [(doc["specialty"], doc["diseases"]) for doc in DOCTORS]
+    diseases = list(DISEASE_KNOWLEDGE)
+    for i in range(n):
+        specialty, treats = rng.choice(templates)
+        treats = list(treats)
+        if rng.random() < 0.3:
+            treats.append(rng.choice(diseases))
+        yield {
+            "name": f"Dr. Synthetic {i}",
+            "specialty": specialty,
+            "diseases": list(dict.fromkeys(treats)),
+            "location": f"Clinic {i % 997}, District {i % 50}",
+            "contact": f"+1-555-{i % 10000:04d}",
+            "rating": round(rng.uniform(3.0, 5.0), 1),
+            "latitude": round(center[0] + rng.uniform(-spread_deg, spread_deg), 5),
+            "longitude": round(center[1] + rng.uniform(-spread_deg, spread_deg), 5),
+        }
+
+
+def _latency_us(fn, args_list):
+    times = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return latency_percentiles(times, 'us')
+
+
+def benchmark(sizes=(1_000, 10_000, 100_000), queries=500, top_k=5, seed=0):
+    """Import synthetic directories of each size into a scratch database and time the lookups."""
+    rng = random.Random(seed)
+    diseases = list(DISEASE_KNOWLEDGE)
+    specialties = sorted({doc["specialty"] for doc in DOCTORS})
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            store = DoctorStore(os.path.join(tmp, f"doctors_{size}.sqlite"))
+            start = time.perf_counter()
+            store.import_doctors(synthetic_doctors(size, seed))
+            import_s = time.perf_counter() - start
+
+            by_disease = [(rng.choice(diseases), None, None, top_k) for _ in range(queries)]
+            filtered = [(rng.choice(diseases), "District 7", rng.choice(specialties), top_k) for _ in range(queries)]
+            near = [(rng.choice(diseases), 40.73 + rng.uniform(-1.5, 1.5), -73.94 + rng.uniform(-1.5, 1.5), top_k)
+                    for _ in range(queries)]
+            results.append({
+                "doctors": size,
+                "import_s": import_s,
+                "import_rows_per_s": size / import_s,
+                "suggestions": _latency_us(store.suggestions, by_disease),
+                "filtered_suggestions": _latency_us(store.suggestions, filtered),
+                "nearest": _latency_us(store.nearest, near),
+            })
+            store.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SQLite doctor directory")
+    sub = parser.add_subparsers(dest='command', required=True)
+    load = sub.add_parser('import', help="bulk-load a CSV (or the built-in DOCTORS with no file)")
+    load.add_argument('csv', nargs='?')
+    load.add_argument('--db', default='doctors.sqlite')
+    bench = sub.add_parser('benchmark', help="query latency as the directory grows")
+    bench.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    bench.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args(argv)
+
+    if args.command == 'import':
+        store = DoctorStore(args.db)
+        start = time.perf_counter()
+        count = store.import_csv(args.csv) if args.csv else store.import_doctors(DOCTORS)
+        print(f"Imported {count} doctors into {args.db} in {time.perf_counter() - start:.2f}s")
+    else:
+        for row in benchmark(args.sizes, args.queries):
+            print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
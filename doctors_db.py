@@ -1,3 +1,8 @@
+import csv
+import json
+import os
+import threading
+
 DOCTORS = [
     {
         "name": "Dr. Sarah Johnson",
@@ -270,14 +275,144 @@ DISEASE_KNOWLEDGE = {
     }
 }
 
-def get_suggestions(disease):
-    suggestions = [doc for doc in DOCTORS if disease in doc["diseases"]]
-    return sorted(suggestions, key=lambda x: x["rating"], reverse=True)
+class FrozenRecord(dict):
+    """Read-only dict handed out by the lookups.
+
+    Still a dict, so it serialises with json and reads like the old records,
+    but callers can no longer edit the shared directory through it. Being
+    immutable, it hashes by content, consistently with dict equality.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("doctor directory records are read-only")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+    def __hash__(self):
+        return hash(frozenset(self.items()))
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return FrozenRecord((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class DoctorIndex:
+    """Disease -> doctors ranked by rating, built once.
+
+    Ranked tuples are precomputed per disease and per (disease, specialty), so a
+    lookup walks only that disease's doctors and stops after `top_k` matches.
+    Ties keep directory order, as the old sorted() scan did.
+    """
+
+    def __init__(self, doctors):
+        self.doctors = tuple(_freeze(doc) for doc in doctors)
+        order = sorted(range(len(self.doctors)), key=lambda i: -self.doctors[i]["rating"])
+        by_disease = {}
+        by_specialty = {}
+        for i in order:
+            doc = self.doctors[i]
+            specialty = doc["specialty"].casefold()
+            for disease in doc["diseases"]:
+                by_disease.setdefault(disease, []).append(doc)
+                by_specialty.setdefault((disease, specialty), []).append(doc)
+        self._by_disease = {key: tuple(docs) for key, docs in by_disease.items()}
+        self._by_specialty = {key: tuple(docs) for key, docs in by_specialty.items()}
+
+    def __len__(self):
+        return len(self.doctors)
+
+    def diseases(self):
+        return list(self._by_disease)
+
+    def suggestions(self, disease, location=None, specialty=None, top_k=None):
+        if specialty is None:
+            ranked = self._by_disease.get(disease, ())
+        else:
+            ranked = self._by_specialty.get((disease, specialty.casefold()), ())
+        if location is None:
+            return list(ranked[:top_k])
+
+        location = location.casefold()
+        matches = []
+        for doc in ranked:
+            if top_k is not None and len(matches) >= top_k:
+                break
+            if location in doc["location"].casefold():
+                matches.append(doc)
+        return matches
+
+
+def load_doctors(path):
+    """Read a doctor directory from JSON (a list of records) or CSV.
+
+    CSV files need name, specialty, diseases, location, contact and rating
+    columns, with the diseases separated by ';'.
+    """
+    if str(path).lower().endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+    doctors = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            row["diseases"] = [d.strip() for d in row["diseases"].split(';') if d.strip()]
+            row["rating"] = float(row["rating"])
+            doctors.append(row)
+    return doctors
+
+
+def open_directory(path):
+    """A DoctorIndex over a JSON/CSV file, or a DoctorStore for a SQLite database."""
+    if str(path).lower().endswith(('.db', '.sqlite', '.sqlite3')):
+        from doctor_store import DoctorStore
+        return DoctorStore(path)
+    return DoctorIndex(load_doctors(path))
+
+
+# Built on first use, so importing this module stays cheap
+_index = None
+_index_lock = threading.Lock()
+
+def get_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = open_directory(os.environ['DOCTORS_FILE']) if os.environ.get('DOCTORS_FILE') else DoctorIndex(DOCTORS)
+    return _index
+
+def set_index(index):
+    """Swap the directory behind get_suggestions (a DoctorIndex or DoctorStore, or a list of doctor dicts)."""
+    global _index
+    if not hasattr(index, 'suggestions'):
+        index = DoctorIndex(index)
+    _index = index
+    return index
+
+def get_suggestions(disease, location=None, specialty=None, top_k=None):
+    """Doctors treating `disease`, best rated first.
+
+    `location` matches a case-insensitive substring of the location, `specialty`
+    the exact specialty (case-insensitive); `top_k` caps the list.
+    """
+    return get_index().suggestions(disease, location=location, specialty=specialty, top_k=top_k)
+
+_FROZEN_KNOWLEDGE = {disease: _freeze(info) for disease, info in DISEASE_KNOWLEDGE.items()}
+_UNKNOWN_DISEASE = _freeze({
+    "description": "Information not available.",
+    "actions": ["Consult a doctor"],
+    "precautions": ["General health maintenance"],
+    "urgency": "Unknown"
+})
 
 def get_disease_info(disease):
-    return DISEASE_KNOWLEDGE.get(disease, {
-        "description": "Information not available.",
-        "actions": ["Consult a doctor"],
-        "precautions": ["General health maintenance"],
-        "urgency": "Unknown"
-    })
+    return _FROZEN_KNOWLEDGE.get(disease, _UNKNOWN_DISEASE)
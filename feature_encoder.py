@@ -0,0 +1,160 @@
+import math
+import threading
+import numpy as np
+from symptom_vocab import SymptomVocabulary
+
+# Numerical features scaled by the StandardScaler saved in scaler.joblib
+NUM_COLS = ['Age', 'Temperature', 'Systolic_BP', 'Diastolic_BP', 'Heart_Rate']
+# Every feature that is not a symptom column
+PATIENT_COLS = NUM_COLS + ['Gender', 'Smoking_History', 'Alcohol_Consumption', 'Exercise_Frequency', 'Obesity_Status']
+# Accepted (min, max) of the request's numeric fields: age, and the 'vitals' keys read by the encoder
+AGE_RANGE = (0, 130)
+VITALS = {'temperature': (25.0, 45.0), 'systolic': (40, 300), 'diastolic': (20, 200), 'heart_rate': (20, 300)}
+
+
+def _check_number(value, name, bounds):
+    # bool is an int subclass; NaN/Infinity parse from JSON but are not measurements
+    low, high = bounds
+    if (not isinstance(value, (int, float)) or isinstance(value, bool) or not math.isfinite(value)
+            or not low <= value <= high):
+        raise ValueError(f"'{name}' must be a number from {low} to {high}")
+
+
+def _is_string_list(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+def parse_record(body):
+    """A predict_disease_batch record from a decoded JSON request, or ValueError.
+
+    Every field the encoder reads is type- and range-checked here, so a
+    malformed request is rejected on its own instead of failing the batch it
+    would be scored in. Fields that are missing or null keep the
+    predict_disease defaults.
+    """
+    if not isinstance(body, dict) or not _is_string_list(body.get('symptoms')):
+        raise ValueError("Each request needs a 'symptoms' list of strings")
+    record = {'symptoms': body['symptoms']}
+    age, gender, vitals, history = (body.get(key) for key in ('age', 'gender', 'vitals', 'history'))
+    if age is not None:
+        _check_number(age, 'age', AGE_RANGE)
+        record['age'] = age
+    if gender is not None:
+        if not isinstance(gender, str):
+            raise ValueError("'gender' must be a string")
+        record['gender'] = gender
+    if vitals is not None:
+        if not isinstance(vitals, dict):
+            raise ValueError(f"'vitals' must be an object with numeric {', '.join(VITALS)}")
+        for key, bounds in VITALS.items():
+            if key in vitals:
+                _check_number(vitals[key], f'vitals.{key}', bounds)
+        record['vitals'] = vitals
+    if history is not None:
+        if not _is_string_list(history):
+            raise ValueError("'history' must be a list of strings")
+        record['history'] = history
+    return record
+
+
+class FeatureEncoder:
+    """Encodes patient inputs straight into scaled float64 model rows.
+
+    Built once per model bundle: the symptom name -> column index map and the
+    scaler's mean_/scale_ vectors are precomputed, so encoding a request needs
+    no DataFrame and no scaler call. The output is identical to building the
+    one-row DataFrame and calling scaler.transform on NUM_COLS.
+    """
+
+    def __init__(self, feature_names, scaler):
+        self.feature_names = list(feature_names)
+        self.n_features = len(self.feature_names)
+        self.index = {name: j for j, name in enumerate(self.feature_names)}
+        # Symptom bit i lands in column symptom_idx[i]
+        self.vocabulary = SymptomVocabulary.from_feature_names(self.feature_names, PATIENT_COLS)
+        self.symptom_idx = np.array([self.index[name] for name in self.vocabulary.symptoms], dtype=np.intp)
+
+        self.num_idx = [self.index[c] for c in NUM_COLS]
+        self.mean = np.asarray(scaler.mean_, dtype=np.float64)
+        self.scale = np.asarray(scaler.scale_, dtype=np.float64)
+        # Python floats for the single-row path, where numpy call overhead dominates
+        self._num_stats = list(zip(self.num_idx, self.mean.tolist(), self.scale.tolist()))
+
+        self._age = self.index['Age']
+        self._gender = self.index['Gender']
+        self._temp = self.index['Temperature']
+        self._systolic = self.index['Systolic_BP']
+        self._diastolic = self.index['Diastolic_BP']
+        self._heart_rate = self.index['Heart_Rate']
+        self._smoking = self.index['Smoking_History']
+        self._alcohol = self.index['Alcohol_Consumption']
+        self._exercise = self.index['Exercise_Frequency']
+        self._obesity = self.index['Obesity_Status']
+
+        self._local = threading.local()
+
+    def _fill(self, x, symptoms, age, gender, vitals, history):
+        # x must be zeroed; writes the unscaled values
+        self._fill_patient(x, age, gender, vitals, history)
+
+        # Unknown symptoms are ignored, as in predict_disease
+        index = self.index
+        for s in symptoms:
+            j = index.get(s)
+            if j is not None:
+                x[j] = 1
+
+    def _fill_patient(self, x, age, gender, vitals, history):
+        x[self._age] = age
+        x[self._gender] = 1 if gender.lower() == 'female' else 0
+
+        vitals = vitals or {}
+        x[self._temp] = float(vitals.get('temperature', 36.6))
+        x[self._systolic] = int(vitals.get('systolic', 120))
+        x[self._diastolic] = int(vitals.get('diastolic', 80))
+        x[self._heart_rate] = int(vitals.get('heart_rate', 72))
+
+        history = history or []
+        x[self._smoking] = 1 if "Current smoker" in history else 0
+        x[self._alcohol] = 1 if any(h in history for h in ["Moderate", "Heavy"]) else 0
+        x[self._exercise] = 3 if "Very Active" in history else (2 if "Moderate" in history else (1 if "Light" in history else 0))
+        x[self._obesity] = 1 if "Obesity" in history else 0
+
+    def encode(self, symptoms, age=25, gender='Male', vitals=None, history=None, out=None):
+        """Return a scaled (1, n_features) row.
+
+        Without `out`, a per-thread buffer is reused: the row is only valid until
+        the next encode() call on the same thread.
+        """
+        if out is None:
+            out = getattr(self._local, 'row', None)
+            if out is None:
+                out = self._local.row = np.zeros((1, self.n_features), dtype=np.float64)
+            else:
+                out.fill(0.0)
+        x = out[0]
+        self._fill(x, symptoms, age, gender, vitals, history)
+        for j, mean, scale in self._num_stats:
+            x[j] = (x[j] - mean) / scale
+        return out
+
+    def encode_batch(self, records, symptom_bits=None):
+        """Encode dicts with predict_disease keyword names into a scaled (N, n_features) matrix.
+
+        With `symptom_bits` (a bitset matrix from self.vocabulary, one row per
+        record) the records' 'symptoms' are not read; the whole batch is
+        unpacked into the symptom columns at once.
+        """
+        X = np.zeros((len(records), self.n_features), dtype=np.float64)
+        if symptom_bits is None:
+            for row, record in enumerate(records):
+                self._fill(X[row], record.get('symptoms', []), record.get('age', 25),
+                           record.get('gender', 'Male'), record.get('vitals'), record.get('history'))
+        else:
+            for row, record in enumerate(records):
+                self._fill_patient(X[row], record.get('age', 25), record.get('gender', 'Male'),
+                                   record.get('vitals'), record.get('history'))
+            self.vocabulary.unpack(symptom_bits, out=X, columns=self.symptom_idx)
+        # Same arithmetic as StandardScaler.transform, applied to the whole batch at once
+        X[:, self.num_idx] = (X[:, self.num_idx] - self.mean) / self.scale
+        return X
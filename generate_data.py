@@ -1,6 +1,10 @@
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
-import random
+from symptom_vocab import SymptomVocabulary
 
 # List of symptoms from symptoms.html
 SYMPTOMS = [
@@ -16,6 +20,11 @@ SYMPTOMS = [
     "Frequent urination", "Excessive thirst", "Chronic cough", "Swollen lymph nodes", "Pain behind eyes"
 ]
 
+# Bit order of packed symptom sets; train_model keeps the same column order in feature_names.joblib
+SYMPTOM_VOCABULARY = SymptomVocabulary(SYMPTOMS)
+# Columns holding the packed symptom words when a dataset is read with pack_symptoms=True
+SYMPTOM_BITS_COLUMNS = [f'Symptom_Bits_{w}' for w in range(SYMPTOM_VOCABULARY.n_words)]
+
 DISEASES = [
     "Common Cold", "Influenza", "COVID-19", "Diabetes", "Hypertension", 
     "Anemia", "Gastroenteritis", "Asthma", "Arthritis", "Depression", "Anxiety Disorder",
@@ -25,222 +34,406 @@ DISEASES = [
     "Gout", "Hypothyroidism"
 ]
 
-def generate_sample(disease):
-    sample = {s: 0 for s in SYMPTOMS}
-    
-    # --- Expertised Features Initialization ---
-    age = random.randint(5, 85)
-    gender = random.choice(["Male", "Female"])
-    
-    # Baselines (Normal ranges)
-    temp = round(random.uniform(36.1, 37.2), 1)
-    systolic = random.randint(110, 125)
-    diastolic = random.randint(70, 85)
-    heart_rate = random.randint(60, 90)
-    
-    smoking = 1 if random.random() > 0.8 else 0
-    alcohol = 1 if random.random() > 0.7 else 0
-    exercise = random.choice([0, 1, 2, 3]) # 0=None, 3=Frequent
-    obesity = 1 if random.random() > 0.8 else 0
-
-    # --- Expertised Disease Correlations ---
-    if disease == "Diabetes":
-        age = random.randint(45, 85)
-        obesity = 1 if random.random() > 0.4 else 0
-        exercise = random.choice([0, 1])
-        if random.random() > 0.3: sample["Weight gain"] = 1
-    
-    elif disease == "Hypertension":
-        age = random.randint(50, 85)
-        systolic = random.randint(140, 180)
-        diastolic = random.randint(90, 110)
-        heart_rate = random.randint(85, 110)
-        obesity = 1 if random.random() > 0.5 else 0
-        smoking = 1 if random.random() > 0.4 else 0
-    
-    elif disease == "COVID-19" or disease == "Pneumonia" or disease == "Influenza":
-        temp = round(random.uniform(38.0, 40.5), 1)
-        heart_rate = random.randint(95, 125)
-        if disease == "COVID-19": age = random.randint(20, 85)
-    
-    elif disease == "Anemia":
-        gender = "Female" if random.random() > 0.15 else "Male"
-        heart_rate = random.randint(90, 115) # Compensatory tachycardia
-        temp = round(random.uniform(35.8, 36.5), 1) # Often feel cold
-    
-    elif disease == "Hyperthyroidism":
-        gender = "Female" if random.random() > 0.15 else "Male"
-        heart_rate = random.randint(100, 140)
-        temp = round(random.uniform(37.3, 37.8), 1) # Mildly elevated
-    
-    elif disease == "Urinary Tract Infection":
-        gender = "Female" if random.random() > 0.1 else "Male"
-        if random.random() > 0.4: temp = round(random.uniform(37.5, 38.5), 1)
-
-    elif disease == "Asthma":
-        heart_rate = random.randint(85, 110)
-        if smoking: # Smoking worsens asthma probability/patterns
-            heart_rate = random.randint(95, 120)
-
-    elif disease == "Tuberculosis":
-        temp = round(random.uniform(37.5, 39.0), 1)
-        if random.random() > 0.4: sample["Weight loss"] = 1
-    
-    elif disease == "Dengue":
-        temp = round(random.uniform(39.5, 41.0), 1)
-        heart_rate = random.randint(100, 130)
-    
-    elif disease == "Malaria":
-        temp = round(random.uniform(38.5, 40.5), 1)
-        heart_rate = random.randint(100, 120)
-    
-    elif disease == "Typhoid":
-        temp = round(random.uniform(39.0, 40.5), 1)
-        heart_rate = random.randint(80, 100) # Relatively slow pulse for fever height
-    
-    elif disease == "Chronic Kidney Disease":
-        systolic = random.randint(140, 170)
-        diastolic = random.randint(90, 105)
-    
-    elif disease == "Hypothyroidism":
-        temp = round(random.uniform(35.5, 36.4), 1)
-        heart_rate = random.randint(50, 65)
-
-    # Assign values
-    sample['Age'] = age
-    sample['Gender'] = gender
-    sample['Temperature'] = temp
-    sample['Systolic_BP'] = systolic
-    sample['Diastolic_BP'] = diastolic
-    sample['Heart_Rate'] = heart_rate
-    sample['Smoking_History'] = smoking
-    sample['Alcohol_Consumption'] = alcohol
-    sample['Exercise_Frequency'] = exercise
-    sample['Obesity_Status'] = obesity
-
-    # Symptom patterns
-    if disease == "Common Cold":
-        for s in ["Cough", "Sneezing", "Runny nose", "Sore throat", "Nazal congestion"]:
-            sample[s] = 1 if random.random() > 0.2 else 0
-    elif disease == "Influenza":
-        for s in ["Fever", "Fatigue", "Muscle aches", "Cough", "Chills", "Headache"]:
-            sample[s] = 1 if random.random() > 0.2 else 0
-    elif disease == "COVID-19":
-        for s in ["Fever", "Cough", "Fatigue", "Shortness of breath", "Headache", "Loss of appetite"]:
-            sample[s] = 1 if random.random() > 0.3 else 0
-    elif disease == "Diabetes":
-        for s in ["Fatigue", "Weight loss", "Blurred vision", "Slow wound healing", "Tingling"]:
-            sample[s] = 1 if random.random() > 0.4 else 0
-    elif disease == "Hypertension":
-        for s in ["High blood pressure", "Headache", "Dizziness", "Palpitations"]:
-            sample[s] = 1 if random.random() > 0.4 else 0
-    elif disease == "Anemia":
-        for s in ["Weakness", "Fatigue", "Dizziness", "Shortness of breath"]:
-            sample[s] = 1 if random.random() > 0.3 else 0
-    elif disease == "Gastroenteritis":
-        for s in ["Nausea", "Vomiting", "Diarrhea", "Abdominal pain", "Loss of appetite"]:
-            sample[s] = 1 if random.random() > 0.2 else 0
-    elif disease == "Asthma":
-        for s in ["Wheezing", "Shortness of breath", "Chest tightness", "Cough"]:
-            sample[s] = 1 if random.random() > 0.3 else 0
-    elif disease == "Arthritis":
-        for s in ["Joint pain", "Stiffness", "Swelling in joints", "Limited mobility"]:
-            sample[s] = 1 if random.random() > 0.2 else 0
-    elif disease == "Depression":
-        for s in ["Depression", "Fatigue", "Insomnia", "Loss of appetite", "Mood swings"]:
-            sample[s] = 1 if random.random() > 0.3 else 0
-    elif disease == "Anxiety Disorder":
-        for s in ["Anxiety", "Palpitations", "Rapid heartbeat", "Difficulty in concentrating", "Irritability", "Insomnia"]:
-            sample[s] = 1 if random.random() > 0.3 else 0
-    elif disease == "Migraine":
-        for s in ["Headache", "Nausea", "Blurred vision", "Dizziness", "Irritability"]:
-            sample[s] = 1 if random.random() > 0.2 else 0
-            if s == "Headache": sample[s] = 1
-    elif disease == "Pneumonia":
-        for s in ["Fever", "Cough", "Shortness of breath", "Chest pain", "Fatigue", "Chills"]:
-            sample[s] = 1 if random.random() > 0.2 else 0
-    elif disease == "Urinary Tract Infection":
-        for s in ["Abdominal pain", "Fever", "Weakness", "Nausea"]:
-            sample[s] = 1 if random.random() > 0.3 else 0
-    elif disease == "Hyperthyroidism":
-        for s in ["Weight loss", "Rapid heartbeat", "Anxiety", "Irritability", "Insomnia", "Muscle aches"]:
-            sample[s] = 1 if random.random() > 0.3 else 0
-    elif disease == "Vitamin D Deficiency":
-        for s in ["Fatigue", "Weakness", "Muscle aches", "Joint pain", "Depression", "Irritability"]:
-            sample[s] = 1 if random.random() > 0.3 else 0
-    elif disease == "Lyme Disease":
-        for s in ["Fever", "Fatigue", "Joint pain", "Headache", "Muscle aches", "Chills"]:
-            sample[s] = 1 if random.random() > 0.3 else 0
-            if random.random() > 0.5: sample["Confusion"] = 1 # Brain fog
-            
-    elif disease == "Tuberculosis":
-        for s in ["Chronic cough", "Weight loss", "night sweats", "Fatigue", "Fever", "Chest pain"]:
-            sample[s] = 1 if random.random() > 0.2 else 0
-        if random.random() > 0.6: sample["Cough"] = 1
-
-    elif disease == "Dengue":
-        for s in ["Fever", "Rash", "Joint pain", "Muscle aches", "Headache", "Nausea"]:
-            sample[s] = 1 if random.random() > 0.2 else 0
-        if random.random() > 0.5: sample["Pain behind eyes"] = 1 # Needs addition to symptoms if used, but I'll stick to current
-
-    elif disease == "Malaria":
-        for s in ["Fever", "Chills", "Headache", "Vomiting", "Jaundice", "Muscle aches"]:
-            sample[s] = 1 if random.random() > 0.2 else 0
-        if random.random() > 0.5: sample["night sweats"] = 1
-
-    elif disease == "Typhoid":
-        for s in ["Fever", "Headache", "Abdominal pain", "Weakness", "Loss of appetite", "Rash"]:
-            sample[s] = 1 if random.random() > 0.2 else 0
-        if random.random() > 0.4: sample["Confusion"] = 1
-
-    elif disease == "Hepatitis":
-        for s in ["Jaundice", "Dark urine", "Pale stool", "Nausea", "Fatigue", "Abdominal pain"]:
-            sample[s] = 1 if random.random() > 0.2 else 0
-
-    elif disease == "Chronic Kidney Disease":
-        for s in ["Swelling in legs", "Fatigue", "Shortness of breath", "Itching", "Confusion", "Nausea"]:
-            sample[s] = 1 if random.random() > 0.3 else 0
-
-    elif disease == "GERD":
-        for s in ["Heartburn", "Bloating", "Nausea", "Chest pain", "Sore throat"]:
-            sample[s] = 1 if random.random() > 0.2 else 0
-            if s == "Heartburn": sample[s] = 1
-
-    elif disease == "Psoriasis":
-        for s in ["Skin scaling", "Itching", "Dry skin", "Joint pain"]:
-            sample[s] = 1 if random.random() > 0.2 else 0
-            if s == "Skin scaling": sample[s] = 1
-
-    elif disease == "Gout":
-        for s in ["Joint redness", "Swelling in joints", "Stiffness", "Joint pain"]:
-            sample[s] = 1 if random.random() > 0.2 else 0
-            if s == "Joint redness": sample[s] = 1
-
-    elif disease == "Hypothyroidism":
-        for s in ["Weight gain", "Fatigue", "Cold intolerance", "Depression", "Memory problems", "Muscle aches"]:
-            sample[s] = 1 if random.random() > 0.2 else 0
-            
+# Normal ranges and rates shared by every disease; profiles below override them
+BASELINE = {
+    "age": (5, 85),                  # inclusive integer range
+    "female": 0.5,                   # P(Gender == "Female")
+    "temp": (36.1, 37.2),            # uniform, rounded to 0.1
+    "systolic": (110, 125),
+    "diastolic": (70, 85),
+    "heart_rate": (60, 90),
+    "smoking": 0.2,
+    "alcohol": 0.3,
+    "exercise": (0, 1, 2, 3),        # 0=None, 3=Frequent, drawn uniformly
+    "obesity": 0.2,
+}
+
+# Random symptoms switched on per sample: NOISE_DRAWS picks, each kept with NOISE_P
+NOISE_DRAWS = 3
+NOISE_P = 0.15
+
+# --- Expertised Disease Correlations ---
+# "symptoms": P(symptom) for the disease's core pattern (1.0 = always present)
+# "extra_symptoms": additional symptoms OR'd in after the core pattern
+# "fever": (P, temp range) that the temperature is replaced by the range
+# "smoker_heart_rate": heart rate range used instead when the patient smokes
+DISEASE_PROFILES = {
+    "Common Cold": {
+        "symptoms": {"Cough": 0.8, "Sneezing": 0.8, "Runny nose": 0.8, "Sore throat": 0.8, "Nazal congestion": 0.8},
+    },
+    "Influenza": {
+        "temp": (38.0, 40.5), "heart_rate": (95, 125),
+        "symptoms": {"Fever": 0.8, "Fatigue": 0.8, "Muscle aches": 0.8, "Cough": 0.8, "Chills": 0.8, "Headache": 0.8},
+    },
+    "COVID-19": {
+        "age": (20, 85), "temp": (38.0, 40.5), "heart_rate": (95, 125),
+        "symptoms": {"Fever": 0.7, "Cough": 0.7, "Fatigue": 0.7, "Shortness of breath": 0.7, "Headache": 0.7, "Loss of appetite": 0.7},
+    },
+    "Diabetes": {
+        "age": (45, 85), "obesity": 0.6, "exercise": (0, 1),
+        "symptoms": {"Fatigue": 0.6, "Weight loss": 0.6, "Blurred vision": 0.6, "Slow wound healing": 0.6, "Tingling": 0.6},
+        "extra_symptoms": {"Weight gain": 0.7},
+    },
+    "Hypertension": {
+        "age": (50, 85), "systolic": (140, 180), "diastolic": (90, 110), "heart_rate": (85, 110),
+        "obesity": 0.5, "smoking": 0.6,
+        "symptoms": {"High blood pressure": 0.6, "Headache": 0.6, "Dizziness": 0.6, "Palpitations": 0.6},
+    },
+    "Anemia": {
+        "female": 0.85, "heart_rate": (90, 115), "temp": (35.8, 36.5),  # Compensatory tachycardia, often feel cold
+        "symptoms": {"Weakness": 0.7, "Fatigue": 0.7, "Dizziness": 0.7, "Shortness of breath": 0.7},
+    },
+    "Gastroenteritis": {
+        "symptoms": {"Nausea": 0.8, "Vomiting": 0.8, "Diarrhea": 0.8, "Abdominal pain": 0.8, "Loss of appetite": 0.8},
+    },
+    "Asthma": {
+        "heart_rate": (85, 110), "smoker_heart_rate": (95, 120),  # Smoking worsens asthma patterns
+        "symptoms": {"Wheezing": 0.7, "Shortness of breath": 0.7, "Chest tightness": 0.7, "Cough": 0.7},
+    },
+    "Arthritis": {
+        "symptoms": {"Joint pain": 0.8, "Stiffness": 0.8, "Swelling in joints": 0.8, "Limited mobility": 0.8},
+    },
+    "Depression": {
+        "symptoms": {"Depression": 0.7, "Fatigue": 0.7, "Insomnia": 0.7, "Loss of appetite": 0.7, "Mood swings": 0.7},
+    },
+    "Anxiety Disorder": {
+        "symptoms": {"Anxiety": 0.7, "Palpitations": 0.7, "Rapid heartbeat": 0.7, "Difficulty in concentrating": 0.7,
+                     "Irritability": 0.7, "Insomnia": 0.7},
+    },
+    "Migraine": {
+        "symptoms": {"Headache": 1.0, "Nausea": 0.8, "Blurred vision": 0.8, "Dizziness": 0.8, "Irritability": 0.8},
+    },
+    "Pneumonia": {
+        "temp": (38.0, 40.5), "heart_rate": (95, 125),
+        "symptoms": {"Fever": 0.8, "Cough": 0.8, "Shortness of breath": 0.8, "Chest pain": 0.8, "Fatigue": 0.8, "Chills": 0.8},
+    },
+    "Urinary Tract Infection": {
+        "female": 0.9, "fever": (0.6, (37.5, 38.5)),
+        "symptoms": {"Abdominal pain": 0.7, "Fever": 0.7, "Weakness": 0.7, "Nausea": 0.7},
+    },
+    "Hyperthyroidism": {
+        "female": 0.85, "heart_rate": (100, 140), "temp": (37.3, 37.8),  # Mildly elevated
+        "symptoms": {"Weight loss": 0.7, "Rapid heartbeat": 0.7, "Anxiety": 0.7, "Irritability": 0.7, "Insomnia": 0.7,
+                     "Muscle aches": 0.7},
+    },
+    "Vitamin D Deficiency": {
+        "symptoms": {"Fatigue": 0.7, "Weakness": 0.7, "Muscle aches": 0.7, "Joint pain": 0.7, "Depression": 0.7,
+                     "Irritability": 0.7},
+    },
+    "Lyme Disease": {
+        "symptoms": {"Fever": 0.7, "Fatigue": 0.7, "Joint pain": 0.7, "Headache": 0.7, "Muscle aches": 0.7, "Chills": 0.7},
+        "extra_symptoms": {"Confusion": 1 - 0.5 ** 6},  # Brain fog: a 50% chance per core symptom drawn
+    },
+    "Tuberculosis": {
+        "temp": (37.5, 39.0),
+        "symptoms": {"Chronic cough": 0.8, "Weight loss": 0.8, "night sweats": 0.8, "Fatigue": 0.8, "Fever": 0.8,
+                     "Chest pain": 0.8},
+        "extra_symptoms": {"Cough": 0.4},
+    },
+    "Dengue": {
+        "temp": (39.5, 41.0), "heart_rate": (100, 130),
+        "symptoms": {"Fever": 0.8, "Rash": 0.8, "Joint pain": 0.8, "Muscle aches": 0.8, "Headache": 0.8, "Nausea": 0.8},
+        "extra_symptoms": {"Pain behind eyes": 0.5},
+    },
+    "Malaria": {
+        "temp": (38.5, 40.5), "heart_rate": (100, 120),
+        "symptoms": {"Fever": 0.8, "Chills": 0.8, "Headache": 0.8, "Vomiting": 0.8, "Jaundice": 0.8, "Muscle aches": 0.8},
+        "extra_symptoms": {"night sweats": 0.5},
+    },
+    "Typhoid": {
+        "temp": (39.0, 40.5), "heart_rate": (80, 100),  # Relatively slow pulse for fever height
+        "symptoms": {"Fever": 0.8, "Headache": 0.8, "Abdominal pain": 0.8, "Weakness": 0.8, "Loss of appetite": 0.8,
+                     "Rash": 0.8},
+        "extra_symptoms": {"Confusion": 0.6},
+    },
+    "Hepatitis": {
+        "symptoms": {"Jaundice": 0.8, "Dark urine": 0.8, "Pale stool": 0.8, "Nausea": 0.8, "Fatigue": 0.8,
+                     "Abdominal pain": 0.8},
+    },
+    "Chronic Kidney Disease": {
+        "systolic": (140, 170), "diastolic": (90, 105),
+        "symptoms": {"Swelling in legs": 0.7, "Fatigue": 0.7, "Shortness of breath": 0.7, "Itching": 0.7,
+                     "Confusion": 0.7, "Nausea": 0.7},
+    },
+    "GERD": {
+        "symptoms": {"Heartburn": 1.0, "Bloating": 0.8, "Nausea": 0.8, "Chest pain": 0.8, "Sore throat": 0.8},
+    },
+    "Psoriasis": {
+        "symptoms": {"Skin scaling": 1.0, "Itching": 0.8, "Dry skin": 0.8, "Joint pain": 0.8},
+    },
+    "Gout": {
+        "symptoms": {"Joint redness": 1.0, "Swelling in joints": 0.8, "Stiffness": 0.8, "Joint pain": 0.8},
+    },
+    "Hypothyroidism": {
+        "temp": (35.5, 36.4), "heart_rate": (50, 65),
+        "symptoms": {"Weight gain": 0.8, "Fatigue": 0.8, "Cold intolerance": 0.8, "Depression": 0.8,
+                     "Memory problems": 0.8, "Muscle aches": 0.8},
+    },
+}
+
+FEATURE_COLUMNS = ['Age', 'Gender', 'Temperature', 'Systolic_BP', 'Diastolic_BP', 'Heart_Rate',
+                   'Smoking_History', 'Alcohol_Consumption', 'Exercise_Frequency', 'Obesity_Status']
+
+
+def _draw(rng, disease_idx, key, sample):
+    # Baseline draw for every row, then each disease's override on its own rows
+    values = sample(BASELINE[key], len(disease_idx))
+    for d, disease in enumerate(DISEASES):
+        if key in DISEASE_PROFILES[disease]:
+            rows = np.flatnonzero(disease_idx == d)
+            values[rows] = sample(DISEASE_PROFILES[disease][key], len(rows))
+    return values
+
+
+def generate_columns(disease_idx, rng):
+    """Draw every column for the given array of DISEASES indices at once.
+
+    Returns a dict of numpy arrays: one uint8 column per symptom followed by
+    FEATURE_COLUMNS, with the same distributions per disease as DISEASE_PROFILES
+    describes.
+    """
+    n = len(disease_idx)
+    randint = lambda r, size: rng.integers(r[0], r[1] + 1, size)
+    uniform = lambda r, size: np.round(rng.uniform(r[0], r[1], size), 1)
+    bernoulli = lambda p, size: (rng.random(size) < p).astype(np.uint8)
+    choice = lambda options, size: rng.choice(np.asarray(options), size)
+
+    age = _draw(rng, disease_idx, "age", randint)
+    female = _draw(rng, disease_idx, "female", bernoulli)
+    temp = _draw(rng, disease_idx, "temp", uniform)
+    systolic = _draw(rng, disease_idx, "systolic", randint)
+    diastolic = _draw(rng, disease_idx, "diastolic", randint)
+    heart_rate = _draw(rng, disease_idx, "heart_rate", randint)
+    smoking = _draw(rng, disease_idx, "smoking", bernoulli)
+    alcohol = _draw(rng, disease_idx, "alcohol", bernoulli)
+    exercise = _draw(rng, disease_idx, "exercise", choice)
+    obesity = _draw(rng, disease_idx, "obesity", bernoulli)
+
+    symptom_index = {s: j for j, s in enumerate(SYMPTOMS)}
+    symptoms = np.zeros((n, len(SYMPTOMS)), dtype=np.uint8)
+
+    for d, disease in enumerate(DISEASES):
+        profile = DISEASE_PROFILES[disease]
+        rows = np.flatnonzero(disease_idx == d)
+        if len(rows) == 0:
+            continue
+        if "fever" in profile:
+            p, temp_range = profile["fever"]
+            hit = rows[rng.random(len(rows)) < p]
+            temp[hit] = uniform(temp_range, len(hit))
+        if "smoker_heart_rate" in profile:
+            smokers = rows[smoking[rows] == 1]
+            heart_rate[smokers] = randint(profile["smoker_heart_rate"], len(smokers))
+        for s, p in profile["symptoms"].items():
+            symptoms[rows, symptom_index[s]] = bernoulli(p, len(rows))
+        for s, p in profile.get("extra_symptoms", {}).items():
+            symptoms[rows, symptom_index[s]] |= bernoulli(p, len(rows))
+
     # Add noise
-    for _ in range(3):
-        s = random.choice(SYMPTOMS)
-        if random.random() > 0.85:
-            sample[s] = 1
-            
-    return sample
-
-def main():
-    data = []
-    samples_per_disease = 1500 # Increased for better complexity
-    for _ in range(samples_per_disease):
-        for disease in DISEASES:
-            sample = generate_sample(disease)
-            sample['Disease'] = disease
-            data.append(sample)
-            
-    df = pd.DataFrame(data)
-    df = df.sample(frac=1, random_state=42).reset_index(drop=True)
-    df.to_csv('disease_data.csv', index=False)
-    print(f"Generated {len(df)} samples with demographics in disease_data.csv")
+    for _ in range(NOISE_DRAWS):
+        picked = rng.integers(0, len(SYMPTOMS), n)
+        hit = np.flatnonzero(rng.random(n) < NOISE_P)
+        symptoms[hit, picked[hit]] = 1
+
+    columns = {s: symptoms[:, j] for j, s in enumerate(SYMPTOMS)}
+    columns.update({
+        'Age': age,
+        'Gender': np.where(female == 1, "Female", "Male"),
+        'Temperature': temp,
+        'Systolic_BP': systolic,
+        'Diastolic_BP': diastolic,
+        'Heart_Rate': heart_rate,
+        'Smoking_History': smoking,
+        'Alcohol_Consumption': alcohol,
+        'Exercise_Frequency': exercise,
+        'Obesity_Status': obesity,
+    })
+    return columns
+
+
+# Compact on-disk dtypes for the binary formats; CSV keeps the original text layout
+COLUMN_DTYPES = {
+    **{s: np.uint8 for s in SYMPTOMS},
+    'Age': np.int16,
+    'Gender': np.uint8,              # 0 = Male, 1 = Female (the encoding train_model uses)
+    'Temperature': np.float32,
+    'Systolic_BP': np.int16,
+    'Diastolic_BP': np.int16,
+    'Heart_Rate': np.int16,
+    'Smoking_History': np.uint8,
+    'Alcohol_Consumption': np.uint8,
+    'Exercise_Frequency': np.uint8,
+    'Obesity_Status': np.uint8,
+}
+
+FORMATS = {'.parquet': 'parquet', '.feather': 'feather', '.arrow': 'feather', '.csv': 'csv'}
+
+
+def dataset_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Unsupported dataset extension '{ext}' (use one of {', '.join(FORMATS)})")
+    return FORMATS[ext]
+
+
+def _frame(disease_idx, rng, compact=False):
+    df = pd.DataFrame(generate_columns(disease_idx, rng))
+    if compact:
+        df['Gender'] = (df['Gender'] == "Female")
+        df = df.astype(COLUMN_DTYPES)
+        df['Disease'] = pd.Categorical.from_codes(disease_idx, categories=DISEASES)
+    else:
+        df['Disease'] = np.asarray(DISEASES, dtype=object)[disease_idx]
+    return df
+
+
+def generate_dataset(samples_per_disease=1500, seed=42, compact=False):
+    """Balanced, shuffled dataset with `samples_per_disease` rows per disease."""
+    rng = np.random.default_rng(seed)
+    disease_idx = rng.permutation(np.tile(np.arange(len(DISEASES)), samples_per_disease))
+    return _frame(disease_idx, rng, compact)
+
+
+def _generate_chunk(start, n_rows, seed_seq, compact):
+    # Rows start..start+n_rows cycle through DISEASES, so the whole file stays balanced
+    rng = np.random.default_rng(seed_seq)
+    disease_idx = rng.permutation((start + np.arange(n_rows)) % len(DISEASES))
+    return _frame(disease_idx, rng, compact)
+
+
+class _DatasetWriter:
+    """Appends DataFrame chunks to one parquet, feather (Arrow IPC) or CSV file."""
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        self._writer = None
+        self._first = True
+
+    def write(self, df):
+        if self.fmt == 'csv':
+            df.to_csv(self.path, mode='w' if self._first else 'a', header=self._first, index=False)
+        else:
+            import pyarrow as pa
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                if self.fmt == 'parquet':
+                    import pyarrow.parquet as pq
+                    self._writer = pq.ParquetWriter(self.path, table.schema)
+                else:
+                    self._writer = pa.ipc.new_file(self.path, table.schema)
+            self._writer.write_table(table)
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def write_dataset(path, n_rows, chunk_rows=100_000, workers=None, seed=42, fmt=None):
+    """Generate `n_rows` rows in chunks across a process pool and stream them to `path`.
+
+    Chunks are written in order as they complete, with at most two chunks per
+    worker in flight, so memory stays bounded by chunk_rows rather than n_rows.
+    Each chunk gets its own child of SeedSequence(seed), so the output is the same
+    for any number of workers. Parquet and feather need pyarrow and store the
+    compact COLUMN_DTYPES; CSV keeps the original text layout.
+    """
+    fmt = fmt or dataset_format(path)
+    compact = fmt != 'csv'
+    starts = list(range(0, n_rows, chunk_rows))
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    workers = workers or os.cpu_count() or 1
+
+    writer = _DatasetWriter(path, fmt)
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for start, seed_seq in zip(starts, seeds):
+                pending.append(pool.submit(_generate_chunk, start, min(chunk_rows, n_rows - start), seed_seq, compact))
+                if len(pending) >= 2 * workers:
+                    writer.write(pending.popleft().result())
+            while pending:
+                writer.write(pending.popleft().result())
+    finally:
+        writer.close()
+    return path
+
+
+def read_dataset(path, columns=None, pack_symptoms=False):
+    """Load a dataset written by write_dataset or an older CSV into model-ready form.
+
+    Gender comes back as 0/1 and Disease as plain strings whatever the format,
+    and symptoms as uint8 columns. With `pack_symptoms`, the symptom columns are
+    replaced by SYMPTOM_BITS_COLUMNS, one packed uint64 word each (see
+    SYMPTOM_VOCABULARY.unpack to get them back).
+    """
+    fmt = dataset_format(path)
+    if fmt == 'parquet':
+        df = pd.read_parquet(path, columns=columns)
+    elif fmt == 'feather':
+        df = pd.read_feather(path, columns=columns)
+    else:
+        df = pd.read_csv(path, usecols=columns)
+    return _normalize(df, pack_symptoms)
+
+
+def iter_dataset(path, chunk_rows=100_000, columns=None, pack_symptoms=False):
+    """Yield the dataset as model-ready DataFrames of at most `chunk_rows` rows."""
+    fmt = dataset_format(path)
+    if fmt == 'csv':
+        for df in pd.read_csv(path, usecols=columns, chunksize=chunk_rows):
+            yield _normalize(df, pack_symptoms)
+        return
+
+    import pyarrow as pa
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns)
+    else:
+        reader = pa.ipc.open_file(path)
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    for batch in batches:
+        if fmt == 'feather' and columns is not None:
+            batch = batch.select(columns)
+        for start in range(0, batch.num_rows, chunk_rows):
+            yield _normalize(batch.slice(start, chunk_rows).to_pandas(), pack_symptoms)
+
+
+def _normalize(df, pack_symptoms=False):
+    if 'Gender' in df and not pd.api.types.is_numeric_dtype(df['Gender']):
+        df['Gender'] = df['Gender'].map({'Male': 0, 'Female': 1}).astype(np.uint8)
+    if 'Disease' in df and isinstance(df['Disease'].dtype, pd.CategoricalDtype):
+        df['Disease'] = df['Disease'].astype(str)
+    symptoms = [s for s in SYMPTOMS if s in df]
+    if pack_symptoms and symptoms:
+        # Missing symptom columns (a `columns` subset) pack as absent
+        onehot = np.zeros((len(df), len(SYMPTOMS)), dtype=np.uint8)
+        for s in symptoms:
+            onehot[:, SYMPTOM_VOCABULARY.index[s]] = df[s].to_numpy()
+        bits = SYMPTOM_VOCABULARY.pack(onehot)
+        df = df.drop(columns=symptoms)
+        for w, name in enumerate(SYMPTOM_BITS_COLUMNS):
+            df[name] = bits[:, w]
+    elif symptoms and any(df[s].dtype != np.uint8 for s in symptoms):
+        # CSV parses the 0/1 columns as int64, eight times what they need
+        df = df.astype({s: np.uint8 for s in symptoms})
+    return df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the synthetic disease dataset")
+    parser.add_argument('--samples-per-disease', type=int, default=1500)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='disease_data.parquet',
+                        help="output file; .parquet, .feather/.arrow or .csv")
+    parser.add_argument('--chunk-rows', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, default=None, help="generator processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    n_rows = args.samples_per_disease * len(DISEASES)
+    write_dataset(args.output, n_rows, args.chunk_rows, args.workers, args.seed)
+    print(f"Generated {n_rows} samples with demographics in {args.output}")
 
 if __name__ == "__main__":
     main()
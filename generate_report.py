@@ -1,12 +1,136 @@
 from fpdf import FPDF
+from fpdf import line_break
+from fpdf.enums import Align, XPos, YPos
+from collections import OrderedDict
 import datetime
 import os
+import threading
+
+# Core font; 'Arial' was only ever an alias fpdf2 resolved (with a warning) to this
+FONT = 'helvetica'
+# Cell/multi_cell cursor moves matching the classic FPDF ln=0 / ln=1 behaviour
+SAME_LINE = dict(new_x=XPos.RIGHT, new_y=YPos.TOP)
+NEXT_LINE = dict(new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+# Cached text blocks are drawn through fpdf2 internals, as of the version
+# pinned in requirements.txt; an fpdf2 without them gets plain multi_cell
+LAYOUT_INTERNALS = (
+    hasattr(line_break, 'MultiLineBreak')
+    and {'fragments', 'trailing_nl'} <= set(getattr(getattr(line_break, 'TextLine', None), '_fields', ()))
+    and all(hasattr(FPDF, name) for name in
+            ('_preload_font_styles', '_render_styled_text_line', '_perform_page_break_if_need_be'))
+)
+DISCLAIMER = "DISCLAIMER: This report is generated by an AI model and is for informational purposes only. It does NOT constitute medical advice. Please consult with a qualified healthcare professional for any medical concerns."
+
+class LayoutCache:
+    """Bounded LRU of line-broken text blocks, keyed by text, font and width.
+
+    Breaking a paragraph into justified lines is most of the cost of a report,
+    and the disease descriptions, actions, precautions and the disclaimer are
+    the same for every patient with that disease. Each block is broken once and
+    the cached lines are then drawn directly, producing the same page content
+    as multi_cell. Entries hold only strings and metrics, never per-document
+    font objects, so one cache serves every report in the process.
+    """
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lines(self, pdf, w, text):
+        key = (text, pdf.font_family, pdf.font_style, pdf.font_size_pt, pdf.x, w)
+        with self._lock:
+            lines = self._entries.get(key)
+            if lines is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return lines
+            self.misses += 1
+
+        # Same line breaking as multi_cell(w, h, text) without padding
+        width = w or pdf.w - pdf.r_margin - pdf.x
+        fragments = pdf._preload_font_styles(pdf.normalize_text(text).replace("\r", ""), False)
+        breaker = line_break.MultiLineBreak(fragments, width, [pdf.c_margin, pdf.c_margin], align=Align.J)
+        lines = []
+        line = breaker.get_line()
+        while line is not None:
+            lines.append(("".join(fragment.string for fragment in line.fragments), line._replace(fragments=())))
+            line = breaker.get_line()
+        lines = tuple(lines)
+
+        with self._lock:
+            self._entries[key] = lines
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits,
+                    "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+LAYOUT_CACHE = LayoutCache()
 
 class MedicalReport(FPDF):
+    """Report document; may hold several patients' reports back to back.
+
+    The footer timestamp is fixed when the document is created (or passed in as
+    `generated_at`, so a whole batch shares one), and page numbers restart at
+    each start_report().
+    """
+
+    def __init__(self, generated_at=None, layout_cache=LAYOUT_CACHE):
+        super().__init__()
+        self.layout_cache = layout_cache
+        # cp1252 covers the dashes and curly quotes in DISEASE_KNOWLEDGE; latin-1 does not
+        self.core_fonts_encoding = 'windows-1252'
+        generated_at = generated_at or datetime.datetime.now()
+        self.footer_suffix = f' | Generated by MediPredict AI on {generated_at.strftime("%Y-%m-%d %H:%M")}'
+        self.report_first_page = 1
+
+    def normalize_text(self, text):
+        # Core fonts can't show arbitrary Unicode: print '?' rather than fail the report
+        if not self.is_ttf_font:
+            return text.encode(self.core_fonts_encoding, errors='replace').decode('latin-1')
+        return super().normalize_text(text)
+
+    def text_block(self, w, h, text):
+        """multi_cell(w, h, text) ending on the next line, reusing cached line breaks.
+
+        Meant for text shared between reports; patient-specific text should go
+        through multi_cell so it doesn't churn the cache. Without the fpdf2
+        internals it relies on (LAYOUT_INTERNALS), it is plain multi_cell.
+        """
+        if self.layout_cache is None or not text or not LAYOUT_INTERNALS:
+            self.multi_cell(w, h, text, **NEXT_LINE)
+            return
+        lines = self.layout_cache.lines(self, w, text)
+        for index, (characters, line) in enumerate(lines):
+            last = index == len(lines) - 1
+            self._perform_page_break_if_need_be(h)
+            fragments = self._preload_font_styles(characters, False)
+            self._render_styled_text_line(line._replace(fragments=fragments), h=h,
+                                          new_x=XPos.LMARGIN if last else XPos.LEFT,
+                                          new_y=YPos.NEXT, border=0, fill=False)
+        if lines[-1][1].trailing_nl:
+            self.ln()
+
+    def start_report(self):
+        self.report_first_page = self.page_no() + 1
+        self.add_page()
+
     def header(self):
-        self.set_font('Arial', 'B', 20)
+        self.set_font(FONT, 'B', 20)
         self.set_text_color(44, 62, 80)
-        self.cell(0, 10, 'MediPredict AI - Diagnosis Report', 0, 1, 'C')
+        self.cell(0, 10, 'MediPredict AI - Diagnosis Report', 0, align='C', **NEXT_LINE)
         self.ln(5)
         self.set_draw_color(44, 62, 80)
         self.line(10, 25, 200, 25)
@@ -14,105 +138,119 @@ class MedicalReport(FPDF):
 
     def footer(self):
         self.set_y(-15)
-        self.set_font('Arial', 'I', 8)
+        self.set_font(FONT, 'I', 8)
         self.set_text_color(149, 165, 166)
-        self.cell(0, 10, f'Page {self.page_no()} | Generated by MediPredict AI on {datetime.datetime.now().strftime("%Y-%m-%d %H:%M")}', 0, 0, 'C')
+        self.cell(0, 10, f'Page {self.page_no() - self.report_first_page + 1}{self.footer_suffix}', 0, align='C', **SAME_LINE)
 
 def generate_pdf_report(user_data, prediction_results, symptoms, suggested_doctors, filename="medical_report.pdf"):
+    """Render a report to `filename` and return it.
+
+    `filename` may also be None, to get the PDF back as bytes, or a writable
+    binary stream (an HTTP response, BytesIO, ...), which receives the PDF and
+    is returned. Neither touches the filesystem.
+    """
     pdf = MedicalReport()
-    pdf.add_page()
+    draw_report(pdf, user_data, prediction_results, symptoms, suggested_doctors)
+    if filename is None:
+        return bytes(pdf.output())
+    if hasattr(filename, 'write'):
+        filename.write(pdf.output())
+        return filename
+    pdf.output(filename)
+    return filename
+
+def draw_report(pdf, user_data, prediction_results, symptoms, suggested_doctors):
+    """Append one patient's report, starting on a new page, to `pdf` (a MedicalReport)."""
+    pdf.start_report()
     
     # User Information
-    pdf.set_font('Arial', 'B', 14)
+    pdf.set_font(FONT, 'B', 14)
     pdf.set_fill_color(236, 240, 241)
-    pdf.cell(0, 10, ' Patient Information', 0, 1, 'L', fill=True)
+    pdf.cell(0, 10, ' Patient Information', 0, align='L', fill=True, **NEXT_LINE)
     pdf.ln(2)
-    pdf.set_font('Arial', '', 11)
-    pdf.cell(95, 8, f"Name: {user_data.get('name', 'N/A')}", 0, 0)
-    pdf.cell(95, 8, f"Email: {user_data.get('email', 'N/A')}", 0, 1)
-    pdf.cell(95, 8, f"Age: {user_data.get('age', 'N/A')}", 0, 0)
-    pdf.cell(95, 8, f"Gender: {user_data.get('gender', 'N/A')}", 0, 1)
-    pdf.cell(95, 8, f"BMI: {user_data.get('bmi', 'N/A')}", 0, 0)
-    pdf.cell(95, 8, f"Status: {user_data.get('bmi_category', 'N/A')}", 0, 1)
+    pdf.set_font(FONT, '', 11)
+    pdf.cell(95, 8, f"Name: {user_data.get('name', 'N/A')}", 0, **SAME_LINE)
+    pdf.cell(95, 8, f"Email: {user_data.get('email', 'N/A')}", 0, **NEXT_LINE)
+    pdf.cell(95, 8, f"Age: {user_data.get('age', 'N/A')}", 0, **SAME_LINE)
+    pdf.cell(95, 8, f"Gender: {user_data.get('gender', 'N/A')}", 0, **NEXT_LINE)
+    pdf.cell(95, 8, f"BMI: {user_data.get('bmi', 'N/A')}", 0, **SAME_LINE)
+    pdf.cell(95, 8, f"Status: {user_data.get('bmi_category', 'N/A')}", 0, **NEXT_LINE)
     pdf.ln(5)
 
     # Symptoms
-    pdf.set_font('Arial', 'B', 14)
-    pdf.cell(0, 10, ' Reported Symptoms', 0, 1, 'L', fill=True)
+    pdf.set_font(FONT, 'B', 14)
+    pdf.cell(0, 10, ' Reported Symptoms', 0, align='L', fill=True, **NEXT_LINE)
     pdf.ln(2)
-    pdf.set_font('Arial', '', 11)
+    pdf.set_font(FONT, '', 11)
     symptoms_text = ", ".join(symptoms)
-    pdf.multi_cell(0, 8, symptoms_text)
+    pdf.multi_cell(0, 8, symptoms_text, **NEXT_LINE)
     pdf.ln(5)
 
     # Diagnosis
-    pdf.set_font('Arial', 'B', 14)
-    pdf.cell(0, 10, ' AI Diagnosis Results', 0, 1, 'L', fill=True)
+    pdf.set_font(FONT, 'B', 14)
+    pdf.cell(0, 10, ' AI Diagnosis Results', 0, align='L', fill=True, **NEXT_LINE)
     pdf.ln(2)
     
     top_result = prediction_results[0]
-    pdf.set_font('Arial', 'B', 12)
+    pdf.set_font(FONT, 'B', 12)
     pdf.set_text_color(192, 57, 43)
-    pdf.cell(0, 10, f"Primary Prediction: {top_result['disease']} ({top_result['confidence']} confidence)", 0, 1)
+    pdf.cell(0, 10, f"Primary Prediction: {top_result['disease']} ({top_result['confidence']} confidence)", 0, **NEXT_LINE)
     pdf.set_text_color(0, 0, 0)
     
     # Disease Details (Expert Analysis)
     if 'info' in top_result:
         info = top_result['info']
-        pdf.set_font('Arial', 'B', 11)
-        pdf.cell(0, 8, 'Expert Analysis & Recommendations:', 0, 1)
-        pdf.set_font('Arial', 'I', 10)
-        pdf.multi_cell(0, 6, f"Description: {info.get('description', 'N/A')}")
+        pdf.set_font(FONT, 'B', 11)
+        pdf.cell(0, 8, 'Expert Analysis & Recommendations:', 0, **NEXT_LINE)
+        pdf.set_font(FONT, 'I', 10)
+        pdf.text_block(0, 6, f"Description: {info.get('description', 'N/A')}")
         pdf.ln(2)
         
-        pdf.set_font('Arial', 'B', 10)
-        pdf.cell(50, 6, "Recommended Actions:", 0, 0)
-        pdf.set_font('Arial', '', 10)
-        pdf.multi_cell(0, 6, ", ".join(info.get('actions', [])))
+        pdf.set_font(FONT, 'B', 10)
+        pdf.cell(50, 6, "Recommended Actions:", 0, **SAME_LINE)
+        pdf.set_font(FONT, '', 10)
+        pdf.text_block(0, 6, ", ".join(info.get('actions', [])))
         
-        pdf.set_font('Arial', 'B', 10)
-        pdf.cell(50, 6, "Key Precautions:", 0, 0)
-        pdf.set_font('Arial', '', 10)
-        pdf.multi_cell(0, 6, ", ".join(info.get('precautions', [])))
+        pdf.set_font(FONT, 'B', 10)
+        pdf.cell(50, 6, "Key Precautions:", 0, **SAME_LINE)
+        pdf.set_font(FONT, '', 10)
+        pdf.text_block(0, 6, ", ".join(info.get('precautions', [])))
         
-        pdf.set_font('Arial', 'B', 10)
-        pdf.cell(50, 6, "Clinical Urgency:", 0, 0)
-        pdf.set_font('Arial', 'B', 10)
+        pdf.set_font(FONT, 'B', 10)
+        pdf.cell(50, 6, "Clinical Urgency:", 0, **SAME_LINE)
+        pdf.set_font(FONT, 'B', 10)
         urgency = info.get('urgency', 'Low')
         if urgency == "High": pdf.set_text_color(192, 57, 43)
-        pdf.cell(0, 6, urgency, 0, 1)
+        pdf.cell(0, 6, urgency, 0, **NEXT_LINE)
         pdf.set_text_color(0, 0, 0)
         pdf.ln(3)
 
-    pdf.set_font('Arial', 'B', 11)
-    pdf.cell(0, 8, 'Other Potential Matches:', 0, 1)
-    pdf.set_font('Arial', '', 11)
+    pdf.set_font(FONT, 'B', 11)
+    pdf.cell(0, 8, 'Other Potential Matches:', 0, **NEXT_LINE)
+    pdf.set_font(FONT, '', 11)
     for res in prediction_results[1:]:
-        pdf.cell(0, 8, f"- {res['disease']}: {res['confidence']}", 0, 1)
+        pdf.cell(0, 8, f"- {res['disease']}: {res['confidence']}", 0, **NEXT_LINE)
     pdf.ln(5)
 
     # Suggested Doctors
     if suggested_doctors:
-        pdf.set_font('Arial', 'B', 14)
-        pdf.cell(0, 10, ' Suggested Specialists Nearby', 0, 1, 'L', fill=True)
+        pdf.set_font(FONT, 'B', 14)
+        pdf.cell(0, 10, ' Suggested Specialists Nearby', 0, align='L', fill=True, **NEXT_LINE)
         pdf.ln(2)
         for doc in suggested_doctors:
-            pdf.set_font('Arial', 'B', 11)
-            pdf.cell(0, 8, f"{doc['name']} ({doc['specialty']})", 0, 1)
-            pdf.set_font('Arial', '', 10)
-            pdf.cell(0, 6, f"Location: {doc['location']}", 0, 1)
-            pdf.cell(0, 6, f"Contact: {doc['contact']} | Rating: {doc['rating']}/5", 0, 1)
+            pdf.set_font(FONT, 'B', 11)
+            pdf.cell(0, 8, f"{doc['name']} ({doc['specialty']})", 0, **NEXT_LINE)
+            pdf.set_font(FONT, '', 10)
+            pdf.cell(0, 6, f"Location: {doc['location']}", 0, **NEXT_LINE)
+            pdf.cell(0, 6, f"Contact: {doc['contact']} | Rating: {doc['rating']}/5", 0, **NEXT_LINE)
             pdf.ln(2)
     
     # Disclaimer
     pdf.ln(10)
-    pdf.set_font('Arial', 'I', 9)
+    pdf.set_font(FONT, 'I', 9)
     pdf.set_text_color(127, 140, 141)
-    disclaimer = "DISCLAIMER: This report is generated by an AI model and is for informational purposes only. It does NOT constitute medical advice. Please consult with a qualified healthcare professional for any medical concerns."
-    pdf.multi_cell(0, 5, disclaimer)
-
-    pdf.output(filename)
-    return filename
+    pdf.text_block(0, 5, DISCLAIMER)
+    pdf.set_text_color(0, 0, 0)
 
 if __name__ == "__main__":
     # Test generation
@@ -0,0 +1,231 @@
+import bisect
+import cProfile
+import json
+import logging
+import os
+import random
+import threading
+import time
+import numpy as np
+
+# Seconds per unit for latency_percentiles
+UNITS = {'s': 1.0, 'ms': 1e-3, 'us': 1e-6}
+# Prometheus-style histogram buckets, in seconds
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, float('inf'))
+
+
+def latency_percentiles(seconds, unit='ms'):
+    """Mean, p50, p95 and p99 of latencies given in seconds, keyed e.g. "p50_ms" for unit 'ms'.
+
+    All None when there are no samples.
+    """
+    samples = np.asarray(seconds, dtype=np.float64) / UNITS[unit]
+    if not len(samples):
+        return {f"{name}_{unit}": None for name in ('mean', 'p50', 'p95', 'p99')}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99]).tolist()
+    return {f"mean_{unit}": float(samples.mean()), f"p50_{unit}": p50, f"p95_{unit}": p95, f"p99_{unit}": p99}
+
+
+class Trace:
+    """Stage timings for one call: mark(stage) closes the stage that just ran."""
+
+    __slots__ = ('operation', 'start', 'last', 'stages', 'counters', 'profiler', '_instrumentation')
+
+    def __init__(self, operation, instrumentation, profiler=None):
+        self.operation = operation
+        self._instrumentation = instrumentation
+        self.profiler = profiler
+        self.stages = []
+        self.counters = {}
+        self.start = self.last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    @property
+    def total(self):
+        return self.last - self.start
+
+    def finish(self):
+        self._instrumentation._finish(self)
+
+    def as_dict(self):
+        return {
+            "operation": self.operation,
+            "total_ms": self.total * 1000.0,
+            "stages_ms": {stage: seconds * 1000.0 for stage, seconds in self.stages},
+            "counters": self.counters,
+        }
+
+
+class _NullTrace:
+    """Returned while instrumentation is off, so the hot path pays one attribute call per stage."""
+
+    __slots__ = ()
+
+    def mark(self, stage):
+        pass
+
+    def count(self, name, value=1):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+class LogSink:
+    """One log line per call."""
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger('predict.trace')
+        self.level = level
+
+    def emit(self, trace):
+        stages = ' '.join(f"{stage}={seconds * 1000.0:.3f}ms" for stage, seconds in trace.stages)
+        counters = ' '.join(f"{name}={value}" for name, value in trace.counters.items())
+        self.logger.log(self.level, "%s total=%.3fms %s %s", trace.operation, trace.total * 1000.0, stages, counters)
+
+
+class JsonlSink:
+    """Appends each trace as a JSON line to `path`."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', buffering=1, encoding='utf-8')
+
+    def emit(self, trace):
+        line = json.dumps({"time": time.time(), **trace.as_dict()})
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class MetricsRegistry:
+    """In-process counters and per-stage latency histograms, rendered in the
+    Prometheus text exposition format by render()."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters = {}
+        # (operation, stage) -> [bucket counts, sum, count]
+        self._histograms = {}
+
+    def _observe(self, operation, stage, seconds):
+        key = (operation, stage)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+        histogram[0][bisect.bisect_left(self.buckets, seconds)] += 1
+        histogram[1] += seconds
+        histogram[2] += 1
+
+    def emit(self, trace):
+        with self._lock:
+            for stage, seconds in trace.stages:
+                self._observe(trace.operation, stage, seconds)
+            self._observe(trace.operation, 'total', trace.total)
+            key = (trace.operation, 'calls')
+            self._counters[key] = self._counters.get(key, 0) + 1
+            for name, value in trace.counters.items():
+                key = (trace.operation, name)
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    def counter(self, operation, name):
+        with self._lock:
+            return self._counters.get((operation, name), 0)
+
+    def render(self):
+        lines = ['# TYPE predict_events_total counter']
+        with self._lock:
+            for (operation, name), value in sorted(self._counters.items()):
+                lines.append(f'predict_events_total{{operation="{operation}",event="{name}"}} {value}')
+            lines.append('# TYPE predict_stage_seconds histogram')
+            for (operation, stage), (counts, total, count) in sorted(self._histograms.items()):
+                labels = f'operation="{operation}",stage="{stage}"'
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'predict_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f'predict_stage_seconds_sum{{{labels}}} {total}')
+                lines.append(f'predict_stage_seconds_count{{{labels}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+class Instrumentation:
+    """Hands out traces and fans finished ones out to the sinks.
+
+    With no sinks and the profiler off, start() returns NULL_TRACE. Otherwise
+    every call is traced. When profile_slow() is on, a `sample_rate` fraction
+    of calls also run under cProfile, and those slower than the threshold dump
+    their stats to `profile_dir` as <operation>-<timestamp>-<ms>ms.prof.
+    """
+
+    def __init__(self):
+        self.sinks = []
+        self.profile_threshold = None
+        self.profile_dir = '.'
+        self.profile_sample_rate = 0.0
+        self.profiles_dumped = 0
+        self.active = False
+
+    def _update(self):
+        self.active = bool(self.sinks) or self.profile_threshold is not None
+
+    def add_sink(self, sink):
+        self.sinks = self.sinks + [sink]
+        self._update()
+        return sink
+
+    def remove_sink(self, sink):
+        self.sinks = [s for s in self.sinks if s is not sink]
+        self._update()
+
+    def profile_slow(self, threshold_ms, profile_dir='profiles', sample_rate=0.1):
+        """Profile a sample of calls; keep the cProfile dumps of those over threshold_ms.
+        threshold_ms=None turns profiling off."""
+        self.profile_threshold = None if threshold_ms is None else threshold_ms / 1000.0
+        self.profile_dir = profile_dir
+        self.profile_sample_rate = sample_rate
+        if threshold_ms is not None:
+            os.makedirs(profile_dir, exist_ok=True)
+        self._update()
+
+    def start(self, operation):
+        if not self.active:
+            return NULL_TRACE
+        profiler = None
+        if self.profile_threshold is not None and random.random() < self.profile_sample_rate:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return Trace(operation, self, profiler)
+
+    def _finish(self, trace):
+        if trace.profiler is not None:
+            trace.profiler.disable()
+            if trace.total >= self.profile_threshold:
+                path = os.path.join(self.profile_dir, f"{trace.operation}-{time.time_ns()}-{trace.total * 1000.0:.0f}ms.prof")
+                trace.profiler.dump_stats(path)
+                self.profiles_dumped += 1
+                trace.count('profile_dumped')
+        for sink in self.sinks:
+            sink.emit(trace)
+
+
+_instrumentation = Instrumentation()
+
+def get_instrumentation():
+    return _instrumentation
@@ -0,0 +1,84 @@
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from generate_data import SYMPTOMS
+from instrumentation import latency_percentiles
+
+
+def random_request(rng):
+    return {
+        "symptoms": rng.sample(SYMPTOMS, rng.randint(1, 6)),
+        "age": rng.randint(5, 85),
+        "gender": rng.choice(["Male", "Female"]),
+        "vitals": {
+            "temperature": round(rng.uniform(36.0, 40.5), 1),
+            "systolic": rng.randint(100, 170),
+            "diastolic": rng.randint(65, 105),
+            "heart_rate": rng.randint(55, 130),
+        },
+    }
+
+
+def _client(host, port, n_requests, seed, latencies, errors):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port)
+    for _ in range(n_requests):
+        body = json.dumps(random_request(rng))
+        start = time.perf_counter()
+        try:
+            conn.request('POST', '/predict', body, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection(host, port)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def run(host='127.0.0.1', port=8000, concurrency=16, requests=2000, seed=0):
+    """Fire `requests` /predict calls from `concurrency` keep-alive clients and summarise."""
+    latencies, errors = [], []
+    # Exactly `requests` in total: the first requests % concurrency clients send one extra
+    per_client = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+    threads = [threading.Thread(target=_client, args=(host, port, n, seed + i, latencies, errors))
+               for i, n in enumerate(per_client) if n]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(latencies) + len(errors),
+        "errors": len(errors),
+        "elapsed_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        **latency_percentiles(latencies),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load generator for server.py")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    summary = run(args.host, args.port, args.concurrency, args.requests, args.seed)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import os
+import threading
+import time
+from feature_encoder import FeatureEncoder
+from model_pack import PACK_FILE, load_pack
+from tree_compiler import FLAT_MODEL_DIR, compile_gradient_boosting, is_supported, load_flat, source_stamp
+
+# Files produced by train_model.train
+MODEL_FILE = 'disease_model.joblib'
+FEATURES_FILE = 'feature_names.joblib'
+SCALER_FILE = 'scaler.joblib'
+# Optional stamp; bumping its contents forces a reload even if mtimes are unchanged
+VERSION_FILE = 'model_version.txt'
+
+
+class ModelBundle:
+    """The resident model, feature names, scaler and the encoder built from them.
+
+    `model` is None when the bundle was loaded from a model pack.
+    """
+
+    def __init__(self, model, feature_names, scaler, signature, version, load_time, predictor=None):
+        self.model = model
+        # What predict_proba is called on: the flattened ensemble when available
+        self.predictor = predictor if predictor is not None else model
+        self.feature_names = feature_names
+        self.scaler = scaler
+        self.encoder = FeatureEncoder(feature_names, scaler)
+        self.signature = signature
+        self.version = version
+        self.load_time = load_time
+        self.loaded_at = time.time()
+
+
+class ModelRegistry:
+    """Process-wide cache of the model bundle.
+
+    The bundle is loaded once and kept resident. Every `check_interval` seconds
+    the registry stats the model files (and reads the version stamp) and reloads
+    the bundle only if something changed.
+    """
+
+    def __init__(self, base_dir='.', check_interval=1.0):
+        self.base_dir = base_dir
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._bundle = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.total_load_time = 0.0
+
+    def _path(self, name):
+        return os.path.join(self.base_dir, name)
+
+    def _signature(self):
+        # (mtime, size) of each model file plus the version stamp. A pack alone
+        # also counts as a model; None if neither is complete.
+        signature = []
+        for name in (MODEL_FILE, FEATURES_FILE, SCALER_FILE, PACK_FILE):
+            try:
+                st = os.stat(self._path(name))
+            except FileNotFoundError:
+                signature.append(None)
+            else:
+                signature.append((st.st_mtime_ns, st.st_size))
+        if None in signature[:3] and signature[3] is None:
+            return None
+        version = self._read_version()
+        signature.append(version)
+        return tuple(signature)
+
+    def _read_version(self):
+        try:
+            with open(self._path(VERSION_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _load(self, signature):
+        start = time.perf_counter()
+        packed = self._packed()
+        if packed is not None:
+            return ModelBundle(None, packed.feature_names, packed.scaler, signature, signature[-1],
+                               time.perf_counter() - start, packed.ensemble)
+        # joblib (and sklearn, to unpickle the model) only when there is no usable pack
+        import joblib
+        model = joblib.load(self._path(MODEL_FILE))
+        feature_names = joblib.load(self._path(FEATURES_FILE))
+        scaler = joblib.load(self._path(SCALER_FILE))
+        predictor = self._flatten(model)
+        load_time = time.perf_counter() - start
+        return ModelBundle(model, feature_names, scaler, signature, signature[-1], load_time, predictor)
+
+    def _packed(self):
+        # The single-file pack loads without joblib or sklearn; use it when it was
+        # built from the current joblib model, or when it is all there is
+        pack_path = self._path(PACK_FILE)
+        if not os.path.exists(pack_path):
+            return None
+        packed = load_pack(pack_path)
+        model_path = self._path(MODEL_FILE)
+        if not os.path.exists(model_path) or packed.source == source_stamp(model_path):
+            return packed
+        return None
+
+    def _flatten(self, model):
+        # Prefer the memory-mapped export written by train_model, if it matches this model
+        if not is_supported(model):
+            return None
+        flat_dir = self._path(FLAT_MODEL_DIR)
+        if os.path.isdir(flat_dir):
+            flat = load_flat(flat_dir)
+            if flat.source == source_stamp(self._path(MODEL_FILE)):
+                return flat
+        return compile_gradient_boosting(model)
+
+    def get(self):
+        """Return the resident bundle, (re)loading it if needed. None if files are missing."""
+        bundle = self._bundle
+        now = time.monotonic()
+        if bundle is not None and now - self._checked_at < self.check_interval:
+            self.hits += 1
+            return bundle
+
+        signature = self._signature()
+        if signature is None:
+            return None
+        if bundle is not None and bundle.signature == signature:
+            self._checked_at = now
+            self.hits += 1
+            return bundle
+
+        with self._lock:
+            bundle = self._bundle
+            if bundle is None or bundle.signature != signature:
+                if bundle is not None:
+                    self.reloads += 1
+                bundle = self._load(signature)
+                self.total_load_time += bundle.load_time
+                self._bundle = bundle
+                self.misses += 1
+            else:
+                self.hits += 1
+            self._checked_at = time.monotonic()
+        return bundle
+
+    def invalidate(self):
+        with self._lock:
+            self._bundle = None
+            self._checked_at = 0.0
+
+    def stats(self):
+        bundle = self._bundle
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "loaded": bundle is not None,
+            "version": bundle.version if bundle else None,
+            "last_load_time": bundle.load_time if bundle else None,
+            "total_load_time": self.total_load_time,
+        }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
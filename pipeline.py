@@ -0,0 +1,278 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from instrumentation import latency_percentiles
+from predict import predict_disease_batch
+
+
+class PipelineError(Exception):
+    pass
+
+
+class StageMetrics:
+    """Count and rolling latency percentiles for one pipeline stage."""
+
+    def __init__(self, window=10_000):
+        self.count = 0
+        self.errors = 0
+        self._samples = deque(maxlen=window)
+
+    def observe(self, seconds):
+        self.count += 1
+        self._samples.append(seconds)
+
+    def snapshot(self):
+        summary = {"count": self.count, "errors": self.errors}
+        if self._samples:
+            summary.update(latency_percentiles(self._samples))
+        return summary
+
+
+class _Job:
+    __slots__ = ('record', 'user', 'prediction', 'report', 'submitted', 'predicted', 'queued_for_render')
+
+    def __init__(self, record, user, loop):
+        self.record = record
+        self.user = user
+        self.prediction = loop.create_future()
+        self.report = loop.create_future()
+        self.submitted = time.perf_counter()
+        self.predicted = None
+        self.queued_for_render = None
+
+
+def render_report(user, results, symptoms):
+    """Executor entry point: one report as PDF bytes."""
+    # fpdf loads in the render workers, not in the process that only predicts
+    from generate_report import generate_pdf_report
+    return generate_pdf_report(user, results, symptoms, results[0]['doctors'], None)
+
+
+class ReportPipeline:
+    """Two-stage asyncio pipeline: batched inference, then report rendering.
+
+    submit() waits only for the prediction; the PDF arrives later on the job's
+    report future. Records queue for inference in a bounded queue and are scored
+    together (up to `max_batch`, waiting at most `window` seconds for more). The
+    predictions then queue, again bounded, for `render_workers` renderers that
+    run in `executor` (a process pool by default). When rendering falls behind,
+    its queue fills, inference blocks on it, the inference queue fills in turn,
+    and submit() waits: backpressure reaches the callers instead of memory
+    growing.
+
+    Use as `async with ReportPipeline() as pipeline:`.
+    """
+
+    STAGES = ('predict_wait', 'predict', 'render_wait', 'render', 'time_to_prediction', 'time_to_report')
+
+    def __init__(self, predict_fn=predict_disease_batch, render_fn=render_report, max_batch=64, window=0.002,
+                 queue_size=256, render_workers=2, executor=None):
+        self.predict_fn = predict_fn
+        self.render_fn = render_fn
+        self.max_batch = max_batch
+        self.window = window
+        self.queue_size = queue_size
+        self.render_workers = render_workers
+        self._executor = executor
+        self._owns_executor = executor is None
+        self.metrics = {stage: StageMetrics() for stage in self.STAGES}
+        self.batches = 0
+        self._tasks = []
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.render_workers)
+        self._predict_queue = asyncio.Queue(self.queue_size)
+        self._render_queue = asyncio.Queue(self.queue_size)
+        self._tasks = [asyncio.create_task(self._inference_stage(), name='inference')]
+        self._tasks += [asyncio.create_task(self._render_stage(), name=f'render-{i}')
+                        for i in range(self.render_workers)]
+        return self
+
+    async def close(self):
+        """Finish everything already submitted, then stop the stages."""
+        await self._predict_queue.join()
+        await self._render_queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._owns_executor:
+            self._executor.shutdown()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def submit(self, record, user=None):
+        """Queue one predict_disease_batch record; returns (results, report future)."""
+        job = _Job(record, user or {}, self._loop)
+        await self._predict_queue.put(job)
+        results = await job.prediction
+        return results, job.report
+
+    async def _collect(self):
+        batch = [await self._predict_queue.get()]
+        deadline = self._loop.time() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._predict_queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._predict_queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _predict(self, records):
+        try:
+            results = self.predict_fn(records)
+        except Exception as e:
+            raise PipelineError(repr(e)) from e
+        if isinstance(results, str):
+            raise PipelineError(results)
+        return results
+
+    def _score(self, records):
+        # (result, error) per record: one call for the batch, and if that
+        # fails, record by record so only the bad records fail
+        try:
+            return [(result, None) for result in self._predict(records)]
+        except PipelineError as e:
+            if len(records) == 1:
+                return [(None, e)]
+        return [self._score([record])[0] for record in records]
+
+    async def _inference_stage(self):
+        while True:
+            batch = []
+            for job in await self._collect():
+                # The caller already gave up on it (e.g. asyncio.wait_for timed out)
+                if job.prediction.done():
+                    job.report.cancel()
+                    self._predict_queue.task_done()
+                else:
+                    batch.append(job)
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            # In a thread so submitters keep queueing while the batch is scored
+            outcomes = await asyncio.to_thread(self._score, [job.record for job in batch])
+            done = time.perf_counter()
+            self.batches += 1
+
+            scored = []
+            for job, (result, error) in zip(batch, outcomes):
+                if error is not None:
+                    self.metrics['predict'].errors += 1
+                    if not job.prediction.done():
+                        job.prediction.set_exception(error)
+                    job.report.cancel()
+                    self._predict_queue.task_done()
+                    continue
+                self.metrics['predict_wait'].observe(start - job.submitted)
+                self.metrics['predict'].observe(done - start)
+                self.metrics['time_to_prediction'].observe(done - job.submitted)
+                job.predicted = done
+                if job.prediction.done():
+                    # Cancelled while its batch was being scored: nobody waits for the report
+                    job.report.cancel()
+                    self._predict_queue.task_done()
+                    continue
+                job.prediction.set_result(result)
+                scored.append((job, result))
+            for job, result in scored:
+                job.queued_for_render = time.perf_counter()
+                await self._render_queue.put((job, result))
+                self._predict_queue.task_done()
+
+    async def _render_stage(self):
+        while True:
+            job, results = await self._render_queue.get()
+            start = time.perf_counter()
+            self.metrics['render_wait'].observe(start - job.queued_for_render)
+            try:
+                pdf = await self._loop.run_in_executor(
+                    self._executor, self.render_fn, job.user, results, job.record['symptoms'])
+            except Exception as e:
+                self.metrics['render'].errors += 1
+                if not job.report.cancelled():
+                    job.report.set_exception(PipelineError(repr(e)))
+            else:
+                done = time.perf_counter()
+                self.metrics['render'].observe(done - start)
+                self.metrics['time_to_report'].observe(done - job.submitted)
+                if not job.report.cancelled():
+                    job.report.set_result(pdf)
+            finally:
+                self._render_queue.task_done()
+
+    def stats(self):
+        return {
+            "stages": {stage: metrics.snapshot() for stage, metrics in self.metrics.items()},
+            "batches": self.batches,
+            "avg_batch_size": self.metrics['predict'].count / self.batches if self.batches else 0.0,
+            "queued": {"predict": self._predict_queue.qsize(), "render": self._render_queue.qsize()},
+        }
+
+
+async def run(requests=1000, concurrency=64, seed=0, **pipeline_options):
+    """Drive the pipeline with `concurrency` clients issuing random requests."""
+    from loadgen import random_request
+    rng = random.Random(seed)
+    records = [random_request(rng) for _ in range(requests)]
+    reports = []
+
+    async with ReportPipeline(**pipeline_options) as pipeline:
+        async def client(chunk):
+            for record in chunk:
+                _, report = await pipeline.submit(record, {"name": "Load Test"})
+                reports.append(report)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(records[i::concurrency]) for i in range(concurrency)))
+        predicted = time.perf_counter() - start
+        pdfs = await asyncio.gather(*reports)
+        finished = time.perf_counter() - start
+        stats = pipeline.stats()
+
+    stats.update({
+        "requests": requests,
+        "predictions_per_s": requests / predicted,
+        "reports_per_s": requests / finished,
+        "pdf_bytes": sum(len(pdf) for pdf in pdfs),
+    })
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive the prediction -> report pipeline with random requests")
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--window-ms', type=float, default=2.0)
+    parser.add_argument('--queue-size', type=int, default=256)
+    parser.add_argument('--render-workers', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    stats = asyncio.run(run(args.requests, args.concurrency, args.seed, max_batch=args.max_batch,
+                            window=args.window_ms / 1000.0, queue_size=args.queue_size,
+                            render_workers=args.render_workers))
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
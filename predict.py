@@ -1,78 +1,212 @@
-import joblib
-import pandas as pd
+import warnings
 import numpy as np
-import os
-from doctors_db import get_suggestions, get_disease_info
+from instrumentation import get_instrumentation
+from model_registry import get_registry
+from prediction_cache import get_prediction_cache
+from tree_compiler import FlatTreeEnsemble
 
-def predict_disease(symptoms_list, age=25, gender='Male', vitals=None, history=None):
-    # Load model, feature names, and scaler
-    if not os.path.exists('disease_model.joblib') or not os.path.exists('feature_names.joblib') or not os.path.exists('scaler.joblib'):
-        return "Required model files not found. Please train the model first."
+TOP_K = 3
+# The flat ensemble wins on small batches; sklearn's compiled tree walk is faster on wide ones
+FLAT_BATCH_MAX = 128
+# Features listed in each explanation, largest absolute contribution first
+EXPLAIN_FEATURES = 5
 
-    model = joblib.load('disease_model.joblib')
-    feature_names = joblib.load('feature_names.joblib')
-    scaler = joblib.load('scaler.joblib')
-    
-    # Prepare input data
-    input_data = {s: 0 for s in feature_names}
-    
-    # Set demographics
-    input_data['Age'] = age
-    input_data['Gender'] = 1 if gender.lower() == 'female' else 0
-    
-    # Set Vitals (Numerical)
-    vitals = vitals or {}
-    input_data['Temperature'] = float(vitals.get('temperature', 36.6))
-    input_data['Systolic_BP'] = int(vitals.get('systolic', 120))
-    input_data['Diastolic_BP'] = int(vitals.get('diastolic', 80))
-    input_data['Heart_Rate'] = int(vitals.get('heart_rate', 72))
-    
-    # Set Lifestyle/History (Categorical/Binary)
-    history = history or []
-    input_data['Smoking_History'] = 1 if "Current smoker" in history else 0
-    input_data['Alcohol_Consumption'] = 1 if any(x in history for x in ["Moderate", "Heavy"]) else 0
-    input_data['Exercise_Frequency'] = 3 if "Very Active" in history else (2 if "Moderate" in history else (1 if "Light" in history else 0))
-    input_data['Obesity_Status'] = 1 if "Obesity" in history else 0
-    
-    # Set Symptoms
-    for s in symptoms_list:
-        if s in input_data:
-            input_data[s] = 1
-            
-    input_df = pd.DataFrame([input_data])[feature_names]
-    
-    # Scale numerical features
-    num_cols = ['Age', 'Temperature', 'Systolic_BP', 'Diastolic_BP', 'Heart_Rate']
-    input_df[num_cols] = scaler.transform(input_df[num_cols])
-    
-    # Make prediction
-    probabilities = model.predict_proba(input_df)[0]
-    
-    # Get top 3 predictions
-    classes = model.classes_
-    top_indices = np.argsort(probabilities)[-3:][::-1]
-    
+def predict_disease(symptoms_list, age=25, gender='Male', vitals=None, history=None, use_cache=True,
+                    explain=False):
+    trace = get_instrumentation().start('predict_disease')
+    try:
+        # Model, feature names, and scaler stay resident in the registry
+        bundle = get_registry().get()
+        trace.mark('model')
+        if bundle is None:
+            trace.count('model_missing')
+            return "Required model files not found. Please train the model first."
+
+        model = bundle.predictor
+
+        # Encode straight into a scaled float64 row, no DataFrame round-trip
+        input_row = bundle.encoder.encode(symptoms_list, age, gender, vitals, history)
+        trace.mark('encode')
+
+        # Make prediction, unless the same encoded patient was scored recently
+        cache = get_prediction_cache() if use_cache else None
+        cached = None
+        if cache is not None:
+            key = cache.key(input_row)
+            cached = cache.get(key, bundle.signature)
+            trace.mark('cache')
+        if cached is None:
+            probabilities, explanations = _predict_proba(model, input_row)[0], None
+            if cache is not None:
+                trace.count('cache_miss')
+            trace.mark('inference')
+        else:
+            probabilities, explanations = cached
+            trace.count('cache_hit')
+
+        # Get top 3 predictions
+        top_indices = np.argsort(probabilities)[-TOP_K:][::-1]
+        trace.mark('top_k')
+        # A cache hit brings its explanation along; only new ones are computed
+        explain = explain and isinstance(model, FlatTreeEnsemble)
+        explained = explain and explanations is None
+        if explained:
+            explanations = _explain(bundle, input_row, top_indices[None, :])[0]
+        trace.mark('explain')
+        if cache is not None and (cached is None or explained):
+            cache.put(key, probabilities, bundle.signature, explanations)
+        results = _format_results(model.classes_, probabilities, top_indices, explanations if explain else None)
+        trace.mark('lookups')
+        return results
+    finally:
+        # Also on errors: a sampled call's profiler must not stay enabled on this thread
+        trace.finish()
+
+def _format_results(classes, probabilities, top_indices, explanations=None):
+    # The doctor directory and knowledge base load with the first prediction, not with this module
+    from doctors_db import get_disease_info, get_suggestions
     results = []
-    for i in top_indices:
+    for rank, i in enumerate(top_indices):
         disease_name = classes[i]
-        results.append({
+        result = {
             "disease": disease_name,
             "confidence": f"{probabilities[i] * 100:.1f}%",
             "doctors": get_suggestions(disease_name),
             "info": get_disease_info(disease_name)
-        })
-        
+        }
+        if explanations is not None:
+            base, features = explanations[rank]
+            result["explanation"] = {"base": base, "features": [{"feature": name, "contribution": value}
+                                                                for name, value in features]}
+        results.append(result)
     return results
 
+def _explain(bundle, X, top):
+    """Per row, per top class: (base score, ((feature, contribution), ...)) for the features that moved it most.
+
+    Contributions are tree-path attributions in raw (log-odds) score units from
+    the flattened ensemble; base plus all contributions is the class's raw
+    score. Tuples, so the prediction cache can hold them as they are. None per
+    row when the model has no flattened form.
+    """
+    if not isinstance(bundle.predictor, FlatTreeEnsemble):
+        return [None] * len(X)
+    bias, contributions = bundle.predictor.explain(X, top)
+    order = np.argsort(-np.abs(contributions), axis=2, kind='stable')[:, :, :EXPLAIN_FEATURES]
+    picked = np.take_along_axis(contributions, order, axis=2).tolist()
+    names = bundle.feature_names
+    return [tuple((round(base, 4), tuple((names[j], round(value, 4)) for j, value in zip(features, values)
+                                         if value != 0.0))
+                  for base, features, values in zip(row_bias, row_features, row_values))
+            for row_bias, row_features, row_values in zip(bias.tolist(), order.tolist(), picked)]
+
+def _predict_proba(model, X):
+    if isinstance(model, FlatTreeEnsemble):
+        return model.predict_proba(X)
+    # The model was fitted on a DataFrame; plain arrays in the same column order are fine
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        return model.predict_proba(X)
+
+def _batch_model(bundle, n_rows):
+    if n_rows < FLAT_BATCH_MAX or bundle.model is None:
+        return bundle.predictor
+    return bundle.model
+
+def _cached_predict_proba(bundle, X, trace, cache):
+    # Only rows not in the prediction cache go to the model, in one call.
+    # Returns the probabilities, the cached explanations (None for misses),
+    # the keys and the rows that missed; the caller stores the new entries
+    keys = [cache.key(row) for row in X]
+    probabilities = np.empty((len(X), len(bundle.predictor.classes_)), dtype=np.float64)
+    explanations = [None] * len(X)
+    missing = []
+    for row, key in enumerate(keys):
+        cached = cache.get(key, bundle.signature)
+        if cached is None:
+            missing.append(row)
+        else:
+            probabilities[row], explanations[row] = cached
+    trace.mark('cache')
+    trace.count('cache_hit', len(X) - len(missing))
+    trace.count('cache_miss', len(missing))
+    if missing:
+        probabilities[missing] = _predict_proba(_batch_model(bundle, len(missing)), X[missing])
+        trace.mark('inference')
+    return probabilities, explanations, keys, missing
+
+def predict_disease_batch(records, use_cache=True, symptom_bits=None, explain=False):
+    """Score many patients with one predict_proba call.
+
+    Each record is a dict with the predict_disease arguments as keys: 'symptoms',
+    and optionally 'age', 'gender', 'vitals' and 'history'. Returns one top-3
+    result list per record, identical to calling predict_disease on each.
+    Callers holding symptom sets packed by the model's vocabulary
+    (get_registry().get().encoder.vocabulary) can pass them as `symptom_bits`
+    and leave 'symptoms' out of the records. With `explain`, each result
+    carries an "explanation" of its raw score (see _explain); off by default,
+    as it costs about as much as the prediction itself on a single row.
+    """
+    trace = get_instrumentation().start('predict_disease_batch')
+    try:
+        bundle = get_registry().get()
+        trace.mark('model')
+        if bundle is None:
+            trace.count('model_missing')
+            return "Required model files not found. Please train the model first."
+
+        records = list(records)
+        if not records:
+            return []
+        trace.count('records', len(records))
+
+        X = bundle.encoder.encode_batch(records, symptom_bits)
+        trace.mark('encode')
+        if use_cache:
+            cache = get_prediction_cache()
+            probabilities, explanations, keys, missing = _cached_predict_proba(bundle, X, trace, cache)
+        else:
+            probabilities = _predict_proba(_batch_model(bundle, len(X)), X)
+            explanations, missing = [None] * len(records), []
+            trace.mark('inference')
+
+        # Top 3 per row without a full sort, then order those 3 by probability
+        k = min(TOP_K, probabilities.shape[1])
+        top = np.argpartition(probabilities, -k, axis=1)[:, -k:]
+        top_probs = np.take_along_axis(probabilities, top, axis=1)
+        top = np.take_along_axis(top, np.argsort(-top_probs, axis=1, kind='stable'), axis=1)
+        trace.mark('top_k')
+
+        # Cache hits bring their explanations along; only the other rows are explained
+        explain = explain and isinstance(bundle.predictor, FlatTreeEnsemble)
+        unexplained = [row for row, explanation in enumerate(explanations) if explanation is None] if explain else []
+        if unexplained:
+            for row, explanation in zip(unexplained, _explain(bundle, X[unexplained], top[unexplained])):
+                explanations[row] = explanation
+        trace.mark('explain')
+        if use_cache:
+            for row in sorted(set(missing).union(unexplained)):
+                cache.put(keys[row], probabilities[row], bundle.signature, explanations[row])
+
+        classes = bundle.predictor.classes_
+        results = [_format_results(classes, probabilities[row], top[row], explanations[row] if explain else None)
+                   for row in range(len(records))]
+        trace.mark('lookups')
+        return results
+    finally:
+        trace.finish()
+
 if __name__ == "__main__":
     # Test prediction
     test_symptoms = ["Fever", "Cough", "Fatigue", "Shortness of breath"]
     print(f"Testing with symptoms: {', '.join(test_symptoms)}")
     
-    results = predict_disease(test_symptoms, age=30, gender='Male')
+    results = predict_disease(test_symptoms, age=30, gender='Male', explain=True)
     if isinstance(results, str):
         print(results)
     else:
         print("\nTop Predictions:")
         for r in results:
             print(f"- {r['disease']}: {r['confidence']}")
+            if r.get('explanation'):
+                print("    " + ", ".join(f"{f['feature']} {f['contribution']:+.2f}" for f in r['explanation']['features']))
@@ -0,0 +1,98 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """LRU + TTL cache of class probabilities, and their explanation, keyed by the encoded feature row.
+
+    Keys hash the scaled float64 row the model actually sees, so requests that
+    differ only in symptom order or in unknown symptoms share an entry. Entries
+    are tagged with the model bundle's signature; the first lookup after the model
+    changes drops everything. An entry's explanation is whatever immutable
+    value the caller stored with it (predict._explain's tuples), or None.
+    """
+
+    def __init__(self, maxsize=10_000, ttl=600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._model_signature = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(row):
+        return hashlib.blake2b(row.tobytes(), digest_size=16).digest()
+
+    def _check_model(self, model_signature):
+        # Called with the lock held
+        if model_signature != self._model_signature:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._model_signature = model_signature
+
+    def get(self, key, model_signature):
+        """Cached (probabilities, explanation) for `key`, or None."""
+        with self._lock:
+            self._check_model(model_signature)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            probabilities, explanation, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return probabilities, explanation
+
+    def put(self, key, probabilities, model_signature, explanation=None):
+        value = probabilities.copy()
+        value.flags.writeable = False
+        with self._lock:
+            self._check_model(model_signature)
+            self._entries[key] = (value, explanation, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_prediction_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PredictionCache()
+    return _cache
@@ -0,0 +1,192 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from pipeline import StageMetrics
+from feature_encoder import parse_record
+from predict import predict_disease_batch
+
+
+def iter_requests(path, offset=0):
+    """Yield (offset, next_offset, record, error) for each non-blank line from byte `offset` on.
+
+    The file is read lazily in binary, so offsets are exact byte positions
+    whatever the encoding. Lines that are not JSON, or not a request with a
+    'symptoms' list, come through with record None and the error message.
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            start, offset = offset, offset + len(line)
+            if not line.strip():
+                continue
+            try:
+                record, error = parse_record(json.loads(line)), None
+            except ValueError as e:
+                record, error = None, str(e)
+            yield start, offset, record, error
+
+
+def _batches(items, size):
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _result_line(offset, results, full):
+    if not full:
+        results = [{key: r[key] for key in ("disease", "confidence", "explanation") if key in r} for r in results]
+    return json.dumps({"offset": offset, "results": results})
+
+
+def _score(records, use_cache, explain=False):
+    # One call for the batch; if it fails, record by record so one bad record
+    # (e.g. a non-numeric age) does not take the others down with it
+    try:
+        return predict_disease_batch(records, use_cache=use_cache, explain=explain), []
+    except Exception:
+        pass
+    results, errors = [], []
+    for record in records:
+        try:
+            results.append(predict_disease_batch([record], use_cache=use_cache, explain=explain)[0])
+            errors.append(None)
+        except Exception as e:
+            results.append(None)
+            errors.append(f"{type(e).__name__}: {e}")
+    return results, errors
+
+
+def _add(previous, counts):
+    return {name: previous.get(name, 0) + value for name, value in counts.items()}
+
+
+def _read_checkpoint(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_checkpoint(path, state):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def replay(input_path, output_path, batch_size=64, checkpoint=None, resume=False, limit=None,
+           use_cache=True, full=False, explain=False):
+    """Score a JSONL request log into a JSONL results file, `batch_size` requests per call.
+
+    Memory stays constant: the input is streamed, and each batch is written
+    out before the next one is read. Every output line carries the byte
+    offset of its request, and bad requests produce {"offset", "error"} lines
+    instead of stopping the run. `full` keeps the doctors and disease info in
+    the results; `explain` adds each prediction's explanation to either form.
+
+    With `checkpoint`, after every batch the output is flushed and synced,
+    and the next input offset and the output size are saved atomically. With
+    `resume`, the run continues from that checkpoint: the input is read from
+    the saved offset and anything written after the checkpoint is cut from
+    the output first, so each request is scored exactly once across restarts.
+
+    Returns throughput, error counts and per-batch latency percentiles.
+    """
+    state = _read_checkpoint(checkpoint) if checkpoint and resume else None
+    offset = state["input_offset"] if state else 0
+    if state:
+        with open(output_path, 'r+b') as out:
+            out.truncate(state["output_bytes"])
+    previous = state["stats"] if state else {}
+
+    latency = StageMetrics()
+    counts = {"requests": 0, "scored": 0, "invalid": 0, "failed": 0, "batches": 0}
+    lines = iter_requests(input_path, offset)
+    if limit is not None:
+        lines = itertools.islice(lines, limit)
+
+    start = time.perf_counter()
+    with open(output_path, 'ab' if state else 'wb') as out:
+        for batch in _batches(lines, batch_size):
+            valid = [(line_offset, record) for line_offset, _, record, error in batch if record is not None]
+            t = time.perf_counter()
+            results, errors = _score([record for _, record in valid], use_cache, explain) if valid else ([], [])
+            if isinstance(results, str):
+                raise RuntimeError(results)
+            latency.observe(time.perf_counter() - t)
+
+            by_offset = dict(zip((line_offset for line_offset, _ in valid),
+                                 itertools.zip_longest(results, errors)))
+            out_lines = []
+            for line_offset, _, record, error in batch:
+                if record is None:
+                    counts["invalid"] += 1
+                    out_lines.append(json.dumps({"offset": line_offset, "error": error}))
+                    continue
+                result, failure = by_offset[line_offset]
+                if failure is not None:
+                    counts["failed"] += 1
+                    out_lines.append(json.dumps({"offset": line_offset, "error": failure}))
+                else:
+                    counts["scored"] += 1
+                    out_lines.append(_result_line(line_offset, result, full))
+            out.write(('\n'.join(out_lines) + '\n').encode('utf-8'))
+            counts["requests"] += len(batch)
+            counts["batches"] += 1
+            offset = batch[-1][1]
+
+            if checkpoint:
+                out.flush()
+                os.fsync(out.fileno())
+                _write_checkpoint(checkpoint, {"input": os.path.abspath(input_path), "input_offset": offset,
+                                               "output_bytes": out.tell(), "stats": _add(previous, counts)})
+    elapsed = time.perf_counter() - start
+
+    batch_latency = latency.snapshot()
+    batch_latency.pop("count")
+    batch_latency.pop("errors")
+    return {
+        **counts,
+        "errors": counts["invalid"] + counts["failed"],
+        "resumed_from": state["input_offset"] if state else None,
+        "input_offset": offset,
+        "elapsed_s": elapsed,
+        "requests_per_s": counts["requests"] / elapsed if elapsed else 0.0,
+        "batch_latency": batch_latency,
+        # Counts across every run since the first, when resumed
+        "totals": _add(previous, counts) if state else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a JSONL log of patient requests into JSONL results")
+    parser.add_argument('input', help="JSONL file, one predict request per line")
+    parser.add_argument('-o', '--output', default='results.jsonl')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--checkpoint', help="checkpoint file written after every batch")
+    parser.add_argument('--resume', action='store_true', help="continue from --checkpoint if it exists")
+    parser.add_argument('--limit', type=int, help="stop after this many requests")
+    parser.add_argument('--no-cache', action='store_true', help="bypass the prediction cache")
+    parser.add_argument('--full', action='store_true', help="include doctors and disease info in each result")
+    parser.add_argument('--explain', action='store_true', help="explain each prediction's score")
+    args = parser.parse_args(argv)
+    if args.resume and not args.checkpoint:
+        parser.error("--resume needs --checkpoint")
+
+    stats = replay(args.input, args.output, args.batch_size, args.checkpoint, args.resume, args.limit,
+                   use_cache=not args.no_cache, full=args.full, explain=args.explain)
+    print(json.dumps(stats, indent=2), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
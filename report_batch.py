@@ -0,0 +1,190 @@
+import argparse
+import datetime
+import io
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from doctors_db import DISEASE_KNOWLEDGE, get_suggestions, get_disease_info
+from generate_report import LayoutCache, MedicalReport, draw_report, generate_pdf_report
+from instrumentation import latency_percentiles
+
+
+def sample_records(n, seed=0):
+    """`n` synthetic (user, results, symptoms, doctors) records for benchmarks."""
+    rng = random.Random(seed)
+    diseases = list(DISEASE_KNOWLEDGE)
+    symptoms = ["Fever", "Cough", "Fatigue", "Headache", "Nausea", "Joint pain", "Chest pain", "Rash"]
+    for i in range(n):
+        top = rng.sample(diseases, 3)
+        confidences = sorted((rng.uniform(1, 99) for _ in top), reverse=True)
+        results = [{"disease": d, "confidence": f"{c:.1f}%", "doctors": get_suggestions(d), "info": get_disease_info(d)}
+                   for d, c in zip(top, confidences)]
+        user = {"name": f"Patient {i}", "email": f"patient{i}@example.com", "age": rng.randint(5, 90),
+                "gender": rng.choice(["Male", "Female"]), "bmi": round(rng.uniform(17, 35), 1), "bmi_category": "Normal"}
+        yield user, results, rng.sample(symptoms, rng.randint(1, 5)), results[0]["doctors"]
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _render_chunk(start, records, combine, generated_at):
+    """Render one chunk in a worker: [(member name, pdf bytes)]."""
+    if combine:
+        pdf = MedicalReport(generated_at)
+        for record in records:
+            draw_report(pdf, *record)
+        return [(f"reports_{start:06d}-{start + len(records) - 1:06d}.pdf", bytes(pdf.output()))]
+
+    rendered = []
+    for offset, record in enumerate(records):
+        pdf = MedicalReport(generated_at)
+        draw_report(pdf, *record)
+        rendered.append((f"report_{start + offset:06d}.pdf", bytes(pdf.output())))
+    return rendered
+
+
+def render_reports(records, output, workers=None, chunk_size=50, combine=False, generated_at=None):
+    """Render (user, results, symptoms, doctors) records across a process pool into a zip.
+
+    Records are consumed lazily and at most two chunks per worker are in flight,
+    so memory stays flat however many reports go through. Each chunk's PDFs are
+    written to `output` (a path or binary file object) as soon as the chunk is
+    done, in input order. With `combine`, each chunk becomes one multi-report
+    PDF sharing its fonts and page resources instead of one file per patient.
+    Every report in the batch carries the same generation timestamp.
+
+    Returns throughput stats.
+    """
+    workers = workers or os.cpu_count() or 1
+    generated_at = generated_at or datetime.datetime.now()
+    chunks = _chunks(records, chunk_size)
+    reports = 0
+    written = 0
+
+    start = time.perf_counter()
+    # PDF page streams are already deflated; storing avoids compressing them twice
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        position = 0
+
+        def submit():
+            nonlocal position
+            chunk = next(chunks, None)
+            if chunk is None:
+                return False
+            pending.append((len(chunk), pool.submit(_render_chunk, position, chunk, combine, generated_at)))
+            position += len(chunk)
+            return True
+
+        while len(pending) < 2 * workers and submit():
+            pass
+        while pending:
+            count, future = pending.pop(0)
+            for name, data in future.result():
+                archive.writestr(name, data)
+                written += len(data)
+            reports += count
+            submit()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "reports": reports,
+        "workers": workers,
+        "elapsed_s": elapsed,
+        "reports_per_s": reports / elapsed if elapsed else 0.0,
+        "pdf_bytes": written,
+    }
+
+
+def compare_outputs(n=200, seed=0):
+    """Per-report latency of generate_pdf_report to a file vs to bytes vs to a stream.
+
+    The file case also reads the PDF back, as a service sending it would have to.
+    """
+    records = list(sample_records(n, seed))
+
+    def to_file(record, path):
+        generate_pdf_report(*record, path)
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def to_stream(record, _):
+        return generate_pdf_report(*record, io.BytesIO()).getvalue()
+
+    targets = {
+        "file": to_file,
+        "bytes": lambda record, _: generate_pdf_report(*record, None),
+        "stream": to_stream,
+    }
+    times = {name: [] for name in targets}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "report.pdf")
+        # Interleaved so drift (caches, CPU frequency) hits every target alike
+        for record in [records[0]] + records:
+            for name, render in targets.items():
+                start = time.perf_counter()
+                render(record, path)
+                times[name].append(time.perf_counter() - start)
+
+    # The first render of each target is a warm-up
+    return {name: latency_percentiles(samples[1:]) for name, samples in times.items()}
+
+
+def compare_layout_cache(n=10_000, seed=0):
+    """Serial render time of `n` reports without and with the layout cache."""
+    generated_at = datetime.datetime.now()
+    summary = {}
+    for name, cache in (("uncached", None), ("cached", LayoutCache())):
+        start = time.perf_counter()
+        for record in sample_records(n, seed):
+            pdf = MedicalReport(generated_at, cache)
+            draw_report(pdf, *record)
+            pdf.output()
+        elapsed = time.perf_counter() - start
+        summary[name] = {"elapsed_s": elapsed, "reports_per_s": n / elapsed}
+        if cache is not None:
+            summary[name]["cache"] = cache.stats()
+    summary["speedup"] = summary["uncached"]["elapsed_s"] / summary["cached"]["elapsed_s"]
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render synthetic reports in bulk into a zip archive")
+    parser.add_argument('--count', type=int, default=1000)
+    parser.add_argument('--output', default='reports.zip')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=50)
+    parser.add_argument('--combine', action='store_true', help="one multi-report PDF per chunk")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compare-outputs', action='store_true',
+                        help="benchmark rendering to a file vs bytes vs a stream instead")
+    parser.add_argument('--compare-layout-cache', action='store_true',
+                        help="benchmark --count serial renders with and without the layout cache instead")
+    args = parser.parse_args(argv)
+
+    if args.compare_layout_cache:
+        print(json.dumps(compare_layout_cache(args.count, args.seed), indent=2))
+        return
+    if args.compare_outputs:
+        print(json.dumps(compare_outputs(min(args.count, 500), args.seed), indent=2))
+        return
+
+    summary = render_reports(sample_records(args.count, args.seed), args.output,
+                             args.workers, args.chunk_size, args.combine)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+import argparse
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from predict import predict_disease_batch
+from feature_encoder import parse_record
+from instrumentation import JsonlSink, LogSink, MetricsRegistry, get_instrumentation
+from model_registry import get_registry
+from prediction_cache import get_prediction_cache
+
+
+class PredictionError(Exception):
+    pass
+
+
+class _Pending:
+    def __init__(self, records, explain):
+        self.records = records
+        self.explain = explain
+        self.results = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """Coalesces concurrent requests into one predict_disease_batch call.
+
+    A single worker thread takes the first waiting request, then keeps collecting
+    until `max_batch` records are queued or `window` seconds have passed since
+    the first one arrived, and scores them all together: one call for the
+    requests that asked for explanations and one for the rest.
+    """
+
+    def __init__(self, predict_fn=predict_disease_batch, max_batch=64, window=0.002):
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.window = window
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.records = 0
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, records, explain=False, timeout=30.0):
+        """Score `records` (list of predict_disease_batch dicts) and wait for the results."""
+        pending = _Pending(records, explain)
+        self._queue.put(pending)
+        if not pending.done.wait(timeout):
+            raise PredictionError("Prediction timed out")
+        if pending.error is not None:
+            raise PredictionError(pending.error)
+        return pending.results
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        size = len(batch[0].records)
+        deadline = time.monotonic() + self.window
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                pending = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(pending)
+            size += len(pending.records)
+        return batch, size
+
+    def _run(self):
+        while True:
+            batch, size = self._collect()
+            for explain in (False, True):
+                group = [pending for pending in batch if pending.explain == explain]
+                if group:
+                    self._score(group, explain)
+
+            with self._stats_lock:
+                self.batches += 1
+                self.requests += len(batch)
+                self.records += size
+
+    def _score(self, batch, explain):
+        records = [record for pending in batch for record in pending.records]
+        try:
+            results = self.predict_fn(records, explain=explain)
+            error = results if isinstance(results, str) else None
+        except Exception:
+            # Rescore each request on its own, so one bad request fails alone
+            self._score_each(batch, explain)
+            return
+        start = 0
+        for pending in batch:
+            if error is None:
+                pending.results = results[start:start + len(pending.records)]
+                start += len(pending.records)
+            else:
+                pending.error = error
+            pending.done.set()
+
+    def _score_each(self, batch, explain):
+        for pending in batch:
+            try:
+                results = self.predict_fn(pending.records, explain=explain)
+                if isinstance(results, str):
+                    pending.error = results
+                else:
+                    pending.results = results
+            except Exception as e:
+                pending.error = f"{type(e).__name__}: {e}"
+            pending.done.set()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "batches": self.batches,
+                "requests": self.requests,
+                "records": self.records,
+                "avg_batch_size": self.records / self.batches if self.batches else 0.0,
+                "queued": self._queue.qsize(),
+            }
+
+
+class PredictionHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; don't let Nagle hold the body back
+    disable_nagle_algorithm = True
+    batcher = None
+    metrics = None
+
+    def _send_json(self, status, payload):
+        self._send_body(status, json.dumps(payload).encode('utf-8'), 'application/json')
+
+    def _send_body(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'null')
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {"status": "ok"})
+        elif self.path == '/stats':
+            self._send_json(200, {
+                "batcher": self.batcher.stats(),
+                "registry": get_registry().stats(),
+                "cache": get_prediction_cache().stats(),
+                "worker": {"pid": os.getpid(), **memory_usage()},
+            })
+        elif self.path == '/metrics' and self.metrics is not None:
+            self._send_body(200, self.metrics.render().encode('utf-8'), 'text/plain; version=0.0.4')
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path not in ('/predict', '/predict/batch', '/report'):
+            self._send_json(404, {"error": "Not found"})
+            return
+        try:
+            body = self._read_json()
+            if self.path in ('/predict', '/report'):
+                records = [parse_record(body)]
+            else:
+                items = body.get('records') if isinstance(body, dict) else body
+                if not isinstance(items, list):
+                    raise ValueError("Expected a list of records")
+                records = [parse_record(item) for item in items]
+            # Explanations are opt-in per request: {"explain": true} next to the record(s)
+            explain = body.get('explain', False) if isinstance(body, dict) else False
+            if not isinstance(explain, bool):
+                raise ValueError("'explain' must be true or false")
+        except ValueError as e:
+            self._send_json(400, {"error": str(e)})
+            return
+
+        if not records:
+            self._send_json(200, {"results": []})
+            return
+        try:
+            results = self.batcher.submit(records, explain)
+        except PredictionError as e:
+            self._send_json(503, {"error": str(e)})
+            return
+
+        if self.path == '/report':
+            # Rendered straight into memory; no temporary file per request. fpdf
+            # is imported by the first report, so prediction-only servers never load it
+            from generate_report import generate_pdf_report
+            user = body.get('user') if isinstance(body.get('user'), dict) else {}
+            try:
+                pdf = generate_pdf_report(user, results[0], records[0]['symptoms'], results[0][0]['doctors'], None)
+            except Exception as e:
+                self._send_json(500, {"error": f"Report generation failed: {type(e).__name__}: {e}"})
+                return
+            self._send_body(200, pdf, 'application/pdf')
+        elif self.path == '/predict':
+            self._send_json(200, results[0])
+        else:
+            self._send_json(200, {"results": results})
+
+    def log_message(self, format, *args):
+        # Per-request access logs would dominate the cost of a prediction
+        pass
+
+
+def make_server(host='127.0.0.1', port=8000, max_batch=64, window_ms=2.0, batcher=None):
+    # batcher=False binds the socket without starting a batcher thread (pre-fork parent)
+    if batcher is None:
+        batcher = MicroBatcher(max_batch=max_batch, window=window_ms / 1000.0)
+    handler = type('Handler', (PredictionHandler,), {'batcher': batcher or None})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def memory_usage(pid='self'):
+    """Rss/Pss and shared/private split in kB from /proc (Linux only, {} elsewhere).
+
+    Pss divides shared pages between the processes mapping them, so the sum of
+    the workers' Pss is the real footprint of a pre-forked pool.
+    """
+    wanted = {'Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty'}
+    usage = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                key, _, rest = line.partition(':')
+                if key in wanted:
+                    usage[f'{key.lower()}_kb'] = int(rest.split()[0])
+    except OSError:
+        pass
+    return usage
+
+
+def _exit_on_signal(signum, frame):
+    raise SystemExit(0)
+
+
+def _run_worker(server, index, counters, max_batch, window_ms):
+    def counted(records, explain=False):
+        results = predict_disease_batch(records, explain=explain)
+        counters[index] += len(records)
+        return results
+
+    # Threads do not survive fork, so each worker starts its own batcher
+    server.RequestHandlerClass.batcher = MicroBatcher(counted, max_batch, window_ms / 1000.0)
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def serve_prefork(server, workers, max_batch=64, window_ms=2.0, report_interval=10.0):
+    """Fork `workers` processes that accept on the already-bound `server` socket.
+
+    The caller loads the model first; gc.freeze() then moves everything loaded so
+    far out of the collector's reach, so workers don't dirty those pages while
+    collecting and the model, flat tree arrays and doctor tables stay shared
+    copy-on-write. Every `report_interval` seconds the parent prints each
+    worker's throughput and memory.
+    """
+    counters = multiprocessing.RawArray('Q', workers)
+    gc.freeze()
+
+    children = {}
+    for index in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _run_worker(server, index, counters, max_batch, window_ms)
+            except Exception:
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = index
+
+    last_counts = [0] * workers
+    last_time = time.monotonic()
+    signal.signal(signal.SIGTERM, _exit_on_signal)
+    try:
+        while children:
+            time.sleep(report_interval)
+            for pid in list(children):
+                done, _ = os.waitpid(pid, os.WNOHANG)
+                if done:
+                    print(f"worker {children.pop(pid)} (pid {pid}) exited")
+
+            now = time.monotonic()
+            elapsed = now - last_time
+            total_pss = 0
+            for pid, index in sorted(children.items(), key=lambda item: item[1]):
+                count = counters[index]
+                usage = memory_usage(pid)
+                total_pss += usage.get('pss_kb', 0)
+                print(f"worker {index} pid {pid}: {(count - last_counts[index]) / elapsed:.1f} records/s, "
+                      f"rss {usage.get('rss_kb', 0) / 1024:.1f}MB, pss {usage.get('pss_kb', 0) / 1024:.1f}MB, "
+                      f"shared {(usage.get('shared_clean_kb', 0) + usage.get('shared_dirty_kb', 0)) / 1024:.1f}MB", flush=True)
+                last_counts[index] = count
+            print(f"pool: {len(children)} workers, total pss {total_pss / 1024:.1f}MB", flush=True)
+            last_time = now
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP prediction service with micro-batching")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch', type=int, default=64, help="records per micro-batch")
+    parser.add_argument('--window-ms', type=float, default=2.0, help="max wait to fill a micro-batch")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="pre-forked worker processes sharing the parent's model (Unix only)")
+    parser.add_argument('--report-interval', type=float, default=10.0,
+                        help="seconds between per-worker throughput/memory reports")
+    parser.add_argument('--no-metrics', action='store_true', help="don't trace predictions for GET /metrics")
+    parser.add_argument('--trace-log', help="append per-prediction stage timings to this JSONL file")
+    parser.add_argument('--log-traces', action='store_true', help="log one line of stage timings per prediction")
+    parser.add_argument('--profile-slow-ms', type=float,
+                        help="cProfile a sample of predictions and keep the dumps of those slower than this")
+    parser.add_argument('--profile-sample', type=float, default=0.1, help="fraction of predictions profiled")
+    parser.add_argument('--profile-dir', default='profiles')
+    args = parser.parse_args(argv)
+
+    instrumentation = get_instrumentation()
+    if not args.no_metrics:
+        PredictionHandler.metrics = instrumentation.add_sink(MetricsRegistry())
+    if args.trace_log:
+        instrumentation.add_sink(JsonlSink(args.trace_log))
+    if args.log_traces:
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+        instrumentation.add_sink(LogSink())
+    if args.profile_slow_ms is not None:
+        instrumentation.profile_slow(args.profile_slow_ms, args.profile_dir, args.profile_sample)
+
+    # Load the model before accepting traffic
+    if get_registry().get() is None:
+        print("Required model files not found. Please train the model first.")
+        return 1
+    # predict loads the doctor directory and knowledge tables on first use; load
+    # them here too, so pre-forked workers share one copy instead of each
+    # building its own on its first request
+    from doctors_db import get_index
+    get_index()
+
+    if args.workers > 1:
+        server = make_server(args.host, args.port, batcher=False)
+        print(f"Serving predictions on http://{args.host}:{args.port} with {args.workers} workers "
+              f"(batch {args.max_batch}, window {args.window_ms}ms)")
+        try:
+            serve_prefork(server, args.workers, args.max_batch, args.window_ms, args.report_interval)
+        finally:
+            server.server_close()
+        return 0
+
+    server = make_server(args.host, args.port, args.max_batch, args.window_ms)
+    print(f"Serving predictions on http://{args.host}:{args.port} "
+          f"(batch {args.max_batch}, window {args.window_ms}ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import numpy as np
+
+# What a fresh worker of each kind does before it can answer its first request
+ENTRY_POINTS = {
+    "predict": """
+from predict import predict_disease
+predict_disease(["Fever", "Cough"], 30, "Male", use_cache=False)
+""",
+    "report": """
+from doctors_db import get_disease_info
+from generate_report import generate_pdf_report
+results = [{"disease": "Influenza", "confidence": "80.0%", "doctors": [], "info": get_disease_info("Influenza")}]
+generate_pdf_report({"name": "Startup Check"}, results, ["Fever"], [], None)
+""",
+    "server": """
+import server
+""",
+}
+
+# Milliseconds from the first import to the first result, per entry point
+BUDGETS_MS = {"predict": 500.0, "report": 1000.0, "server": 500.0}
+
+_RUN = """
+import time
+_start = time.perf_counter()
+{code}
+print(time.perf_counter() - _start)
+"""
+
+# import time: <self us> | <cumulative us> | <indent><module>
+_IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_importtime(stderr):
+    """(module, depth, self_us, cumulative_us) for each line of -X importtime output."""
+    modules = []
+    for line in stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, (len(indent) - 1) // 2, int(self_us), int(cumulative_us)))
+    return modules
+
+
+def _breakdown(modules, top):
+    # Self time summed per top-level package, largest first
+    packages = {}
+    for name, _, self_us, _ in modules:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {package: us / 1000.0 for package, us in ranked}
+
+
+def profile_entry_point(name, repeat=3, top=10, base_dir=None):
+    """Run an entry point in `repeat` fresh interpreters under -X importtime.
+
+    startup_ms (first import to first result) and wall_ms are medians; the
+    import breakdown comes from the run closest to the median.
+    """
+    base_dir = base_dir or os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [base_dir, os.environ.get('PYTHONPATH')])))
+    code = _RUN.format(code=ENTRY_POINTS[name])
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=base_dir, env=env,
+                             capture_output=True, text=True, check=True)
+        wall = time.perf_counter() - start
+        runs.append((float(out.stdout.strip().splitlines()[-1]), wall, parse_importtime(out.stderr)))
+
+    startup_ms = float(np.median([run[0] for run in runs])) * 1000.0
+    _, _, modules = min(runs, key=lambda run: abs(run[0] * 1000.0 - startup_ms))
+    return {
+        "startup_ms": startup_ms,
+        "wall_ms": float(np.median([run[1] for run in runs])) * 1000.0,
+        "import_ms": sum(cumulative for _, depth, _, cumulative in modules if depth == 0) / 1000.0,
+        "modules": len(modules),
+        "top_packages_ms": _breakdown(modules, top),
+    }
+
+
+def profile(names=None, repeat=3, top=10):
+    return {name: profile_entry_point(name, repeat, top) for name in names or ENTRY_POINTS}
+
+
+def over_budget(results, budgets=BUDGETS_MS):
+    """(entry point, startup_ms, budget_ms) for every entry point over its budget."""
+    return [(name, result["startup_ms"], budgets[name])
+            for name, result in results.items()
+            if budgets.get(name) is not None and result["startup_ms"] > budgets[name]]
+
+
+def _parse_budget(value):
+    name, _, ms = value.partition('=')
+    if name not in ENTRY_POINTS or not ms:
+        raise argparse.ArgumentTypeError(f"expected <entry point>=<ms> with one of {', '.join(ENTRY_POINTS)}")
+    return name, float(ms)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start cost of each entry point, checked against a budget")
+    parser.add_argument('entry_points', nargs='*',
+                        help=f"entry points to profile: {', '.join(ENTRY_POINTS)} (default: all)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=10, help="packages listed in each breakdown")
+    parser.add_argument('--budget', type=_parse_budget, action='append', default=[],
+                        help="override a budget, e.g. --budget predict=300")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.entry_points if name not in ENTRY_POINTS]
+    if unknown:
+        parser.error(f"unknown entry points: {', '.join(unknown)}")
+
+    budgets = {**BUDGETS_MS, **dict(args.budget)}
+    results = profile(args.entry_points or None, args.repeat, args.top)
+    if args.json:
+        print(json.dumps({"budgets_ms": budgets, "results": results}, indent=2))
+    else:
+        for name, result in results.items():
+            print(f"{name}: {result['startup_ms']:.1f}ms to first result (budget {budgets[name]:.0f}ms), "
+                  f"{result['wall_ms']:.1f}ms process wall, {result['modules']} modules")
+            for package, ms in result["top_packages_ms"].items():
+                print(f"  {ms:8.1f}ms  {package}")
+
+    failures = over_budget(results, budgets)
+    for name, startup_ms, budget_ms in failures:
+        print(f"OVER BUDGET {name}: {startup_ms:.1f}ms > {budget_ms:.0f}ms", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
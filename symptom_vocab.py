@@ -0,0 +1,117 @@
+import numpy as np
+
+# Little-endian on every platform, so packed words have the same bytes everywhere
+WORD = np.dtype('<u8')
+# Popcount ufunc, new in numpy 2.0; count() falls back to unpackbits without it
+_bitwise_count = getattr(np, 'bitwise_count', None)
+
+
+class SymptomVocabulary:
+    """Fixed symptom order, and symptom sets as packed bitsets.
+
+    Symptom i is bit i % 64 of word i // 64, so a set is `n_words` uint64
+    words: 16 bytes for the 69 symptoms of generate_data.SYMPTOMS, against 69
+    uint8 or 552 int64 one-hot columns. Bitset matrices have shape
+    (rows, n_words). Unknown symptom names are ignored, as in predict_disease.
+    """
+
+    def __init__(self, symptoms):
+        self.symptoms = tuple(symptoms)
+        self.index = {name: i for i, name in enumerate(self.symptoms)}
+        if len(self.index) != len(self.symptoms):
+            raise ValueError("symptom names must be unique")
+        self.n_words = max(1, -(-len(self.symptoms) // 64))
+
+    @classmethod
+    def from_feature_names(cls, feature_names, non_symptom):
+        """The vocabulary of a model's symptom columns, in feature_names order."""
+        non_symptom = set(non_symptom)
+        return cls(name for name in feature_names if name not in non_symptom)
+
+    def __len__(self):
+        return len(self.symptoms)
+
+    def __eq__(self, other):
+        return isinstance(other, SymptomVocabulary) and self.symptoms == other.symptoms
+
+    __hash__ = None
+
+    def mask(self, symptoms):
+        """The set as one Python int: hashable, cheap to compare, and what encode() packs."""
+        index = self.index
+        bits = 0
+        for name in symptoms:
+            i = index.get(name)
+            if i is not None:
+                bits |= 1 << i
+        return bits
+
+    def encode(self, symptoms):
+        """A (n_words,) bitset for one collection of symptom names."""
+        return self.encode_batch([symptoms])[0]
+
+    def encode_batch(self, symptom_lists):
+        """A (len(symptom_lists), n_words) bitset matrix."""
+        # Each mask's little-endian bytes are exactly its row of words
+        n_bytes = self.n_words * WORD.itemsize
+        mask = self.mask
+        data = b''.join([mask(symptoms).to_bytes(n_bytes, 'little') for symptoms in symptom_lists])
+        return np.frombuffer(data, dtype=WORD).reshape(-1, self.n_words).copy()
+
+    def decode(self, words):
+        """Symptom names of one (n_words,) bitset, in vocabulary order."""
+        return [self.symptoms[i] for i in np.flatnonzero(self.unpack(np.asarray(words).reshape(1, -1))[0])]
+
+    def pack(self, onehot):
+        """Bitsets from a (rows, len(self)) 0/1 matrix whose columns follow self.symptoms."""
+        onehot = np.asarray(onehot)
+        padded = np.zeros((onehot.shape[0], self.n_words * 64), dtype=np.uint8)
+        padded[:, :len(self.symptoms)] = onehot != 0
+        return np.packbits(padded, axis=1, bitorder='little').view(WORD)
+
+    def unpack(self, bitsets, out=None, columns=None, dtype=np.uint8):
+        """One-hot rows from a (rows, n_words) bitset matrix, in one vectorized pass.
+
+        With `out`, the symptom columns are written into `out[:, columns]`
+        (e.g. the symptom positions of a model row) and `out` is returned.
+        """
+        bitsets = np.ascontiguousarray(bitsets, dtype=WORD).reshape(-1, self.n_words)
+        bits = np.unpackbits(bitsets.view(np.uint8), axis=1, count=len(self.symptoms), bitorder='little')
+        if out is None:
+            return bits if dtype == np.uint8 else bits.astype(dtype)
+        out[:, columns] = bits
+        return out
+
+    # Set operations; all broadcast over rows
+    @staticmethod
+    def union(a, b):
+        return np.bitwise_or(a, b)
+
+    @staticmethod
+    def intersection(a, b):
+        return np.bitwise_and(a, b)
+
+    @staticmethod
+    def difference(a, b):
+        return np.bitwise_and(a, np.bitwise_not(b))
+
+    @staticmethod
+    def count(bitsets):
+        """Number of symptoms in each set."""
+        bitsets = np.asarray(bitsets, dtype=WORD)
+        if _bitwise_count is not None:
+            return _bitwise_count(bitsets).sum(axis=-1, dtype=np.int64)
+        # numpy < 2 has no popcount ufunc: count the bits of the unpacked bytes
+        bits = np.unpackbits(np.ascontiguousarray(bitsets).view(np.uint8), axis=-1)
+        return bits.sum(axis=-1, dtype=np.int64)
+
+    @staticmethod
+    def contains(bitsets, subset):
+        """True where every symptom of `subset` is present."""
+        return (np.bitwise_and(bitsets, subset) == subset).all(axis=-1)
+
+    @staticmethod
+    def unique(bitsets):
+        """(distinct sets, inverse): bitsets == unique[inverse]."""
+        unique, inverse = np.unique(bitsets, axis=0, return_inverse=True)
+        return unique, inverse.reshape(-1)
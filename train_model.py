@@ -1,23 +1,60 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, GridSearchCV
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+from sklearn.model_selection import ParameterGrid, StratifiedKFold, train_test_split
+from sklearn.ensemble import GradientBoostingClassifier, HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, log_loss
 from sklearn.preprocessing import StandardScaler
 import joblib
+from joblib import Parallel, delayed
+from generate_data import SYMPTOM_BITS_COLUMNS, SYMPTOM_VOCABULARY, iter_dataset, read_dataset
+from model_pack import PACK_FILE, write_pack
+from tree_compiler import FLAT_MODEL_DIR, compile_gradient_boosting, is_supported, save_flat, source_stamp
+import argparse
+import datetime
+import hashlib
+import json
+import math
 import os
+import time
+import tracemalloc
+import warnings
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
 
-def train():
-    # Load dataset
-    if not os.path.exists('disease_data.csv'):
-        print("Dataset not found. Please run generate_data.py first.")
-        return
+# Looked up in order when no dataset path is given
+DATASET_FILES = ['disease_data.parquet', 'disease_data.feather', 'disease_data.csv']
 
-    df = pd.read_csv('disease_data.csv')
-    
-    # Preprocess demographics
-    # Convert Gender to numeric (0 for Male, 1 for Female)
-    df['Gender'] = df['Gender'].map({'Male': 0, 'Female': 1})
+def find_dataset():
+    return next((path for path in DATASET_FILES if os.path.exists(path)), None)
+
+# Interchangeable classifiers; 'gb' is the original model and the only one flattened for serving
+BACKENDS = {
+    'gb': ("Gradient Boosting", lambda **params: GradientBoostingClassifier(**{
+        "n_estimators": 100,
+        "learning_rate": 0.1,
+        "max_depth": 5,
+        "random_state": 42,
+        **params
+    })),
+    'hist': ("Histogram Gradient Boosting", lambda **params: HistGradientBoostingClassifier(**{
+        "max_iter": 100,
+        "learning_rate": 0.1,
+        "random_state": 42,
+        **params
+    })),
+    'rf': ("Random Forest", lambda **params: RandomForestClassifier(**{
+        "n_estimators": 200,
+        "n_jobs": -1,
+        "random_state": 42,
+        **params
+    })),
+}
+
+def _load_split(data_path):
+    # Binary formats load with their stored dtypes; Gender is already 0 (Male) / 1 (Female)
+    df = read_dataset(data_path)
     
     # Identify numerical features to scale
     numerical_features = ['Age', 'Temperature', 'Systolic_BP', 'Diastolic_BP', 'Heart_Rate']
@@ -28,42 +65,426 @@ def train():
     
     # Scaler for numerical features
     scaler = StandardScaler()
-    X[numerical_features] = scaler.fit_transform(X[numerical_features])
+    X[numerical_features] = scaler.fit_transform(X[numerical_features].astype(np.float64))
     
+    # Split into training and testing sets
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    return X_train, X_test, y_train, y_test, scaler
+
+def _max_rss_mb():
+    # Process high-water mark; tracemalloc misses memory allocated inside compiled code
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def fit_and_measure(backend, X_train, X_test, y_train, y_test, latency_rows=200, params=None, trace_memory=False):
+    """Fit one backend and measure it: wall time of the fit, the process max RSS
+    so far, test accuracy, and median single-row predict_proba latency.
+
+    With `trace_memory`, the fit also runs under tracemalloc for its peak
+    Python-allocated memory; tracing slows every allocation, so only the
+    backend comparison and the benchmarks turn it on. peak_memory_mb is None
+    otherwise.
+    """
+    model = BACKENDS[backend][1](**(params or {}))
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
+    peak = None
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    # Worker threads only pay off when fitting; a single-row predict is faster without them
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=1)
+
+    y_pred = model.predict(X_test)
+    accuracy = accuracy_score(y_test, y_pred)
+
+    # Serving calls predict_proba one patient at a time on plain arrays
+    rows = X_test.to_numpy()[:latency_rows]
+    latencies = []
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="X does not have valid feature names")
+        for row in rows:
+            start = time.perf_counter()
+            model.predict_proba(row[None, :])
+            latencies.append(time.perf_counter() - start)
+
+    return model, y_pred, {
+        "backend": backend,
+        "fit_time_s": fit_time,
+        "peak_memory_mb": peak / (1024 * 1024) if peak is not None else None,
+        "max_rss_mb": _max_rss_mb(),
+        "accuracy": accuracy,
+        "latency_ms_per_row": float(np.median(latencies)) * 1000.0,
+    }
+
+def _print_metrics(metrics):
+    memory = f"process max rss {metrics['max_rss_mb'] or 0:.0f}MB"
+    if metrics['peak_memory_mb'] is not None:
+        memory = f"peak memory {metrics['peak_memory_mb']:.1f}MB ({memory})"
+    print(f"  fit {metrics['fit_time_s']:.1f}s, {memory}, "
+          f"accuracy {metrics['accuracy'] * 100:.2f}%, inference {metrics['latency_ms_per_row']:.3f}ms/row")
+
+def train(data_path=None, backend='gb', params=None, early_stopping=False):
+    # Load dataset
+    data_path = data_path or find_dataset()
+    if data_path is None or not os.path.exists(data_path):
+        print("Dataset not found. Please run generate_data.py first.")
+        return
+
+    X_train, X_test, y_train, y_test, scaler = _load_split(data_path)
+    if early_stopping:
+        params = {**(params or {}), **_early_stopping(len(X_train), y_train.nunique())}
+
     # Save the scaler
     joblib.dump(scaler, 'scaler.joblib')
     print("Scaler saved as scaler.joblib")
     
     # Feature names
-    feature_names = X.columns.tolist()
+    feature_names = X_train.columns.tolist()
     joblib.dump(feature_names, 'feature_names.joblib')
     
-    # Split into training and testing sets
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
-    # Advanced Classifier: Gradient Boosting for complex analysis
-    from sklearn.ensemble import GradientBoostingClassifier
-    print("Starting Training with Expertised Features (Gradient Boosting)...")
-    
-    model = GradientBoostingClassifier(
-        n_estimators=100,
-        learning_rate=0.1,
-        max_depth=5,
-        random_state=42
-    )
-    
-    model.fit(X_train, y_train)
+    # Advanced Classifier: Gradient Boosting for complex analysis by default
+    print(f"Starting Training with Expertised Features ({BACKENDS[backend][0]})...")
+    model, y_pred, metrics = fit_and_measure(backend, X_train, X_test, y_train, y_test, params=params)
     
     # Evaluate the model
-    y_pred = model.predict(X_test)
-    accuracy = accuracy_score(y_test, y_pred)
-    print(f"Expertised Model Accuracy: {accuracy * 100:.2f}%")
+    print(f"Expertised Model Accuracy: {metrics['accuracy'] * 100:.2f}%")
+    _print_metrics(metrics)
     print("\nClassification Report:")
     print(classification_report(y_test, y_pred))
     
     # Save the model
+    save_model(model, feature_names, scaler)
+    return metrics
+
+def compare_backends(data_path=None, backends=None):
+    """Fit every backend on the same split and print their measurements. Saves nothing."""
+    data_path = data_path or find_dataset()
+    if data_path is None or not os.path.exists(data_path):
+        print("Dataset not found. Please run generate_data.py first.")
+        return
+
+    X_train, X_test, y_train, y_test, _ = _load_split(data_path)
+    results = []
+    for backend in backends or BACKENDS:
+        print(f"Training {BACKENDS[backend][0]} ({backend})...")
+        _, _, metrics = fit_and_measure(backend, X_train, X_test, y_train, y_test, trace_memory=True)
+        _print_metrics(metrics)
+        results.append(metrics)
+
+    print(f"\n{'backend':<8} {'fit s':>8} {'peak MB':>9} {'accuracy':>9} {'ms/row':>8}")
+    for m in results:
+        print(f"{m['backend']:<8} {m['fit_time_s']:>8.1f} {m['peak_memory_mb']:>9.1f} "
+              f"{m['accuracy'] * 100:>8.2f}% {m['latency_ms_per_row']:>8.3f}")
+    return results
+
+# Search space for --tune; n_estimators is a cap, early stopping picks the actual count
+TUNING_GRID = {
+    "n_estimators": [100, 200, 400],
+    "max_depth": [3, 5, 7],
+    "learning_rate": [0.05, 0.1, 0.2],
+}
+
+def _dataset_hash(X, y):
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    digest.update(pd.util.hash_pandas_object(y, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+# Early stopping during tuning: stop after EARLY_STOPPING_ROUNDS stages without
+# improvement on a stratified VALIDATION_FRACTION of the training rows
+EARLY_STOPPING_ROUNDS = 10
+VALIDATION_FRACTION = 0.1
+
+def _early_stopping(n_rows, n_classes):
+    # The stratified validation split needs at least one row of every class;
+    # without enough rows for that, every stage up to n_estimators is fitted
+    if math.ceil(n_rows * VALIDATION_FRACTION) < n_classes:
+        return {}
+    return {"n_iter_no_change": EARLY_STOPPING_ROUNDS, "validation_fraction": VALIDATION_FRACTION}
+
+def _fold_key(data_hash, params, n_samples, fold, cv):
+    key = json.dumps([data_hash, params, n_samples, fold, cv], sort_keys=True)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+def _fit_fold(X, y, train_idx, val_idx, params, classes):
+    model = GradientBoostingClassifier(**params, **_early_stopping(len(train_idx), len(classes)), random_state=42)
+    model.fit(X[train_idx], y[train_idx])
+    proba = model.predict_proba(X[val_idx])
+    return {
+        "log_loss": log_loss(y[val_idx], proba, labels=classes),
+        "accuracy": accuracy_score(y[val_idx], model.classes_[proba.argmax(axis=1)]),
+        "n_estimators_used": int(model.n_estimators_),
+    }
+
+def _affordable(tasks, n_candidates, seconds_per_row, remaining):
+    # How many of the (best-first) candidates fit in `remaining` seconds, costing
+    # each fit at the last round's wall time per training row
+    cost = [0.0] * n_candidates
+    for i, _, _, train_idx, _ in tasks:
+        cost[i] += len(train_idx) * seconds_per_row
+    total = 0.0
+    for kept, candidate_cost in enumerate(cost):
+        total += candidate_cost
+        if total > remaining:
+            return kept
+    return n_candidates
+
+def tune(data_path=None, grid=None, cv=3, factor=3, time_budget=None, cache_dir='.tuning_cache', n_jobs=-1):
+    """Successive-halving search over gradient-boosting hyperparameters.
+
+    Every candidate starts on a small stratified subsample. After each round only
+    the best 1/factor of candidates (by mean validation log loss over `cv` folds)
+    go on to a factor-times larger sample; the last round uses all training
+    rows. Folds run in parallel on all cores. Each fold result is cached in
+    `cache_dir`, keyed by a hash of the training data plus the params, sample size
+    and fold, so a rerun only fits what is missing.
+
+    With `time_budget`, each round after the first is costed before it starts,
+    from the previous round's wall time per training row fitted. A round that
+    would overrun the budget keeps only as many of the best candidates as fit,
+    and when fewer than two fit, the search stops and the best candidate so far
+    wins. The budget covers the search only, not the final retrain by
+    `--tune`. Returns (best_params, results of the last completed round).
+    """
+    data_path = data_path or find_dataset()
+    if data_path is None or not os.path.exists(data_path):
+        print("Dataset not found. Please run generate_data.py first.")
+        return None, []
+
+    start = time.perf_counter()
+    X_train, _, y_train, _, _ = _load_split(data_path)
+    data_hash = _dataset_hash(X_train, y_train)
+    X = X_train.to_numpy(dtype=np.float32)
+    y = y_train.to_numpy()
+    classes = np.unique(y)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    candidates = list(ParameterGrid(grid or TUNING_GRID))
+    n_rounds = 1
+    while factor ** n_rounds < len(candidates):
+        n_rounds += 1
+    # Fixed shuffled order so each round's sample contains the previous one
+    order = np.random.default_rng(42).permutation(len(y))
+    # Folds of the first round must still train on enough rows for early stopping's split
+    early_stopping_rows = math.ceil(math.ceil(len(classes) / VALIDATION_FRACTION) * cv / (cv - 1))
+    min_samples = max(cv * len(classes) * 2, early_stopping_rows, len(y) // factor ** (n_rounds - 1))
+
+    results = []
+    # Wall time per training row fitted, from the last round that fitted anything
+    seconds_per_row = None
+    for round_no in range(n_rounds):
+        elapsed = time.perf_counter() - start
+        if time_budget is not None and results and elapsed > time_budget:
+            print(f"Time budget of {time_budget}s reached, stopping after round {round_no}")
+            break
+        n_samples = len(y) if round_no == n_rounds - 1 else min(len(y), min_samples * factor ** round_no)
+        sample = order[:n_samples]
+        folds = list(StratifiedKFold(cv, shuffle=True, random_state=42).split(sample, y[sample]))
+
+        tasks, cached = [], {}
+        for i, params in enumerate(candidates):
+            for fold, (train_idx, val_idx) in enumerate(folds):
+                path = os.path.join(cache_dir, _fold_key(data_hash, params, n_samples, fold, cv) + '.json')
+                if os.path.exists(path):
+                    with open(path) as f:
+                        cached[(i, fold)] = json.load(f)
+                else:
+                    tasks.append((i, fold, path, sample[train_idx], sample[val_idx]))
+
+        if time_budget is not None and results and seconds_per_row is not None:
+            kept = _affordable(tasks, len(candidates), seconds_per_row, time_budget - elapsed)
+            if kept < 2:
+                print(f"Round {round_no + 1} would overrun the {time_budget}s budget, stopping after round {round_no}")
+                break
+            if kept < len(candidates):
+                print(f"Keeping the best {kept} of {len(candidates)} candidates to stay within the {time_budget}s budget")
+                candidates = candidates[:kept]
+                tasks = [task for task in tasks if task[0] < kept]
+                cached = {key: output for key, output in cached.items() if key[0] < kept}
+
+        print(f"Round {round_no + 1}/{n_rounds}: {len(candidates)} candidates on {n_samples} rows, "
+              f"{len(tasks)} fits ({len(cached)} cached)")
+        round_start = time.perf_counter()
+        outputs = Parallel(n_jobs=n_jobs)(
+            delayed(_fit_fold)(X, y, train_idx, val_idx, candidates[i], classes)
+            for i, _, _, train_idx, val_idx in tasks
+        )
+        if tasks:
+            seconds_per_row = (time.perf_counter() - round_start) / sum(len(task[3]) for task in tasks)
+        for (i, fold, path, _, _), output in zip(tasks, outputs):
+            with open(path, 'w') as f:
+                json.dump(output, f)
+            cached[(i, fold)] = output
+
+        results = []
+        for i, params in enumerate(candidates):
+            folds_out = [cached[(i, fold)] for fold in range(cv)]
+            results.append({
+                "params": params,
+                "n_samples": n_samples,
+                "log_loss": float(np.mean([r["log_loss"] for r in folds_out])),
+                "accuracy": float(np.mean([r["accuracy"] for r in folds_out])),
+                "n_estimators_used": int(np.mean([r["n_estimators_used"] for r in folds_out])),
+            })
+        results.sort(key=lambda r: r["log_loss"])
+        candidates = [r["params"] for r in results[:max(1, math.ceil(len(results) / factor))]]
+
+    best = results[0]
+    print(f"\nBest parameters after {time.perf_counter() - start:.1f}s: {best['params']}")
+    print(f"  validation log loss {best['log_loss']:.4f}, accuracy {best['accuracy'] * 100:.2f}%, "
+          f"~{best['n_estimators_used']} stages used")
+    return best["params"], results
+
+def save_model(model, feature_names=None, scaler=None):
     joblib.dump(model, 'disease_model.joblib')
     print("Model saved as disease_model.joblib")
 
+    # Flattened copy of the trees for fast, memory-mapped inference
+    if is_supported(model):
+        flat = compile_gradient_boosting(model)
+        source = source_stamp('disease_model.joblib')
+        save_flat(flat, source=source)
+        print(f"Flattened model saved in {FLAT_MODEL_DIR}/")
+        # Single-file artifact that serving can load with NumPy alone
+        if feature_names is not None and scaler is not None:
+            write_pack(flat, feature_names, scaler, source=source)
+            print(f"Packed model saved as {PACK_FILE}")
+
+    # Version stamp picked up by model_registry so running predictors reload the new model
+    with open('model_version.txt', 'w') as f:
+        f.write(datetime.datetime.now().strftime("%Y%m%d%H%M%S"))
+
+def _holdout_mask(chunk_no, n_rows, test_fraction, seed):
+    # Same rows land in the test split on every pass over the data
+    return np.random.default_rng([seed, chunk_no]).random(n_rows) < test_fraction
+
+def train_streaming(data_path=None, chunk_rows=50_000, model_kind='sgd', memory_mb=512,
+                    epochs=5, test_fraction=0.2, seed=42):
+    """Train without loading the whole dataset.
+
+    Memory is bounded by `chunk_rows` per pass, plus `memory_mb` for the 'hist'
+    model. Pass 1 fits the StandardScaler with partial_fit and collects the
+    classes. Then either:
+      - 'sgd': a logistic-regression SGDClassifier is updated with partial_fit
+        over `epochs` passes, or
+      - 'hist': training rows are reservoir-sampled into a float32 buffer of at
+        most `memory_mb` (the whole training split when it fits), and a
+        HistGradientBoostingClassifier is fitted on it.
+    A last pass scores the held-out rows. Chunks are read with their symptoms
+    packed into bitsets (16 bytes a row instead of 69 uint8 columns) and
+    unpacked straight into the float32 feature rows.
+    """
+    data_path = data_path or find_dataset()
+    if data_path is None or not os.path.exists(data_path):
+        print("Dataset not found. Please run generate_data.py first.")
+        return
+
+    numerical_features = ['Age', 'Temperature', 'Systolic_BP', 'Diastolic_BP', 'Heart_Rate']
+
+    # Pass 1: scaler statistics, feature names and classes
+    scaler = StandardScaler()
+    feature_names, classes = None, set()
+    n_rows = 0
+    for df in iter_dataset(data_path, chunk_rows, pack_symptoms=True):
+        if feature_names is None:
+            patient_cols = [c for c in df.columns if c != 'Disease' and c not in SYMPTOM_BITS_COLUMNS]
+            feature_names = patient_cols + list(SYMPTOM_VOCABULARY.symptoms)
+        scaler.partial_fit(df[numerical_features].to_numpy(dtype=np.float64))
+        classes.update(df['Disease'].unique())
+        n_rows += len(df)
+    classes = np.array(sorted(classes))
+    num_idx = [feature_names.index(c) for c in numerical_features]
+    print(f"Streaming {n_rows} rows from {data_path} in chunks of {chunk_rows}")
+
+    def chunks():
+        # Scaled float32 features, labels and test mask per chunk
+        for chunk_no, df in enumerate(iter_dataset(data_path, chunk_rows, pack_symptoms=True)):
+            X = np.empty((len(df), len(feature_names)), dtype=np.float32)
+            X[:, :len(patient_cols)] = df[patient_cols].to_numpy(dtype=np.float32)
+            SYMPTOM_VOCABULARY.unpack(df[SYMPTOM_BITS_COLUMNS].to_numpy(), out=X,
+                                      columns=slice(len(patient_cols), None))
+            X[:, num_idx] = scaler.transform(X[:, num_idx].astype(np.float64))
+            yield X, df['Disease'].to_numpy(), _holdout_mask(chunk_no, len(df), test_fraction, seed)
+
+    rng = np.random.default_rng(seed)
+    if model_kind == 'sgd':
+        from sklearn.linear_model import SGDClassifier
+        print("Starting streaming training (SGD logistic regression)...")
+        model = SGDClassifier(loss='log_loss', alpha=1e-5, random_state=seed)
+        for epoch in range(epochs):
+            for X, y, test in chunks():
+                order = rng.permutation(np.flatnonzero(~test))
+                model.partial_fit(X[order], y[order], classes=classes)
+            print(f"Epoch {epoch + 1}/{epochs} done")
+    elif model_kind == 'hist':
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        capacity = max(1, memory_mb * 1024 * 1024 // (4 * len(feature_names) + 8))
+        X_res = np.empty((min(capacity, n_rows), len(feature_names)), dtype=np.float32)
+        y_res = np.empty(len(X_res), dtype=classes.dtype)
+        seen = 0
+        for X, y, test in chunks():
+            X, y = X[~test], y[~test]
+            # Algorithm R: row number t replaces slot randint(0, t] if that slot exists
+            fill = max(0, min(len(X), len(X_res) - seen))
+            X_res[seen:seen + fill], y_res[seen:seen + fill] = X[:fill], y[:fill]
+            slots = rng.integers(0, np.arange(seen + fill, seen + len(X)) + 1)
+            keep = slots < len(X_res)
+            X_res[slots[keep]], y_res[slots[keep]] = X[fill:][keep], y[fill:][keep]
+            seen += len(X)
+        X_res, y_res = X_res[:min(seen, len(X_res))], y_res[:min(seen, len(y_res))]
+        print(f"Starting training on {len(X_res)} of {seen} training rows (Histogram Gradient Boosting)...")
+        model = HistGradientBoostingClassifier(max_iter=200, learning_rate=0.1, random_state=seed)
+        model.fit(X_res, y_res)
+    else:
+        raise ValueError(f"Unknown streaming model '{model_kind}' (use 'sgd' or 'hist')")
+
+    # Evaluate on the held-out rows
+    correct = total = 0
+    for X, y, test in chunks():
+        if test.any():
+            correct += int((model.predict(X[test]) == y[test]).sum())
+            total += int(test.sum())
+    print(f"Streaming Model Accuracy: {correct / max(total, 1) * 100:.2f}% on {total} held-out rows")
+
+    joblib.dump(scaler, 'scaler.joblib')
+    joblib.dump(feature_names, 'feature_names.joblib')
+    print("Scaler saved as scaler.joblib")
+    save_model(model, feature_names, scaler)
+    return model
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the disease prediction model")
+    parser.add_argument('data', nargs='?', default=None, help="dataset path (default: first of %s)" % ", ".join(DATASET_FILES))
+    parser.add_argument('--backend', choices=[*BACKENDS, 'all'], default='gb',
+                        help="classifier to train; 'all' only compares them and saves nothing")
+    parser.add_argument('--tune', action='store_true',
+                        help="search gradient-boosting hyperparameters, then train and save the best")
+    parser.add_argument('--time-budget', type=float, default=None, help="seconds allowed for the --tune search (the final retrain is extra)")
+    parser.add_argument('--tuning-cache', default='.tuning_cache', help="directory for cached fold results")
+    parser.add_argument('--streaming', action='store_true', help="train out-of-core, reading the dataset in chunks")
+    parser.add_argument('--chunk-rows', type=int, default=50_000, help="rows per chunk in streaming mode")
+    parser.add_argument('--stream-model', choices=['sgd', 'hist'], default='sgd')
+    parser.add_argument('--memory-mb', type=int, default=512, help="sample buffer for --stream-model hist")
+    parser.add_argument('--epochs', type=int, default=5, help="passes for --stream-model sgd")
+    args = parser.parse_args(argv)
+
+    if args.streaming:
+        train_streaming(args.data, args.chunk_rows, args.stream_model, args.memory_mb, args.epochs)
+    elif args.tune:
+        params, _ = tune(args.data, time_budget=args.time_budget, cache_dir=args.tuning_cache)
+        if params is not None:
+            # Keep the early-stopped stage count the search settled on
+            train(args.data, 'gb', params, early_stopping=True)
+    elif args.backend == 'all':
+        compare_backends(args.data)
+    else:
+        train(args.data, args.backend)
+
 if __name__ == "__main__":
-    train()
+    main()
@@ -0,0 +1,332 @@
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+
+# Default on-disk location written next to disease_model.joblib
+FLAT_MODEL_DIR = 'disease_model.flat'
+
+# Node arrays saved as one .npy each so they can be memory-mapped
+ARRAY_NAMES = ('feature', 'threshold', 'left', 'value', 'roots')
+
+# Rows scored per chunk; bounds the (rows x trees) traversal state
+CHUNK_ROWS = 32
+
+
+class FlatTreeEnsemble:
+    """A GradientBoostingClassifier flattened into contiguous node arrays.
+
+    All trees are concatenated into the same feature/threshold/left/value arrays
+    (global node indices). Nodes are numbered breadth-first within each tree so
+    the right child is always left + 1, and leaves point to themselves with an
+    infinite threshold. Every tree can then be walked for exactly max_depth
+    steps, which lets a batch of rows advance through all trees with a few
+    vectorized gathers per level.
+    Tree t belongs to stage t // n_tree_classes and class t % n_tree_classes.
+    With `value_scale` (one float per tree), `value` holds integers quantized
+    by model_pack and each leaf value is its integer times its tree's scale.
+    """
+
+    def __init__(self, feature, threshold, left, value, roots, classes,
+                 init_raw, max_depth, n_features, value_scale=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.value = value
+        self.roots = roots
+        self.classes_ = np.asarray(classes)
+        self.init_raw = np.asarray(init_raw, dtype=np.float64)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.value_scale = value_scale
+        self.n_tree_classes = len(self.init_raw)
+        self.n_stages = len(roots) // self.n_tree_classes
+        self.source = None
+        self._bias = None
+
+    def _leaves(self, X):
+        # Global leaf index reached by each row in each tree, shape (n_rows, n_trees)
+        n = X.shape[0]
+        flat_x = X.ravel()
+        row_offsets = (np.arange(n, dtype=np.int32) * self.n_features)[:, None]
+        node = np.broadcast_to(self.roots, (n, len(self.roots))).copy()
+        for _ in range(self.max_depth):
+            x = np.take(flat_x, np.take(self.feature, node) + row_offsets)
+            node = np.take(self.left, node) + (x > np.take(self.threshold, node))
+        return node
+
+    def decision_function(self, X):
+        """Raw scores, shape (n_rows, n_tree_classes)."""
+        # Trees are evaluated on float32 inputs, as in sklearn
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        raw = np.empty((X.shape[0], self.n_tree_classes), dtype=np.float64)
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            chunk = X[start:start + CHUNK_ROWS]
+            leaf_values = np.take(self.value, self._leaves(chunk))
+            if self.value_scale is not None:
+                leaf_values = leaf_values * self.value_scale
+            leaf_values = leaf_values.reshape(len(chunk), self.n_stages, self.n_tree_classes)
+            raw[start:start + len(chunk)] = self.init_raw + leaf_values.sum(axis=1)
+        return raw
+
+    def _node_values(self, node, trees):
+        values = np.take(self.value, node)
+        if self.value_scale is not None:
+            values = values * np.take(self.value_scale, trees)
+        return values
+
+    def _class_bias(self):
+        # Score of each class before any split: init_raw plus the root value of each of its trees
+        if self._bias is None:
+            trees = np.arange(len(self.roots))
+            root_values = self._node_values(np.asarray(self.roots, dtype=np.intp), trees)
+            self._bias = self.init_raw + root_values.reshape(self.n_stages, self.n_tree_classes).sum(axis=0)
+        return self._bias
+
+    def explain(self, X, class_index):
+        """Tree-path (Saabas) contributions to the raw scores of selected classes.
+
+        `class_index` has shape (n_rows, k): for each row, the indices into
+        classes_ to explain. Returns (bias, contributions) of shapes (n_rows, k)
+        and (n_rows, k, n_features). Every split on a row's path credits its
+        feature with the change in node value from parent to child, so
+        bias + contributions.sum(axis=2) equals the decision_function scores of
+        those classes. Only the trees of the requested classes are walked,
+        level by level for all rows at once, and the credits are summed with
+        one bincount per chunk.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        class_index = np.asarray(class_index, dtype=np.intp).reshape(X.shape[0], -1)
+        n, k = class_index.shape
+        n_features = self.n_features
+        bias = self._class_bias()[class_index]
+        contributions = np.empty((n, k, n_features), dtype=np.float64)
+        stage_offsets = np.arange(self.n_stages, dtype=np.intp) * self.n_tree_classes
+        # Contribution slot of each walked tree, before adding the split feature
+        slot_of_tree = np.repeat(np.arange(k, dtype=np.intp) * n_features, self.n_stages)
+
+        for start in range(0, n, CHUNK_ROWS):
+            chunk = X[start:start + CHUNK_ROWS]
+            m = len(chunk)
+            classes = class_index[start:start + m]
+            trees = (classes[:, :, None] + stage_offsets).reshape(m, -1)
+            flat_x = chunk.ravel()
+            row_offsets = (np.arange(m, dtype=np.intp) * n_features)[:, None]
+
+            # Walk down recording each level's nodes and split features; leaves
+            # point to themselves, so finished paths repeat their leaf
+            node = np.take(self.roots, trees)
+            path, features = [node], []
+            for _ in range(self.max_depth):
+                feature = np.take(self.feature, node)
+                x = np.take(flat_x, feature + row_offsets)
+                node = np.take(self.left, node) + (x > np.take(self.threshold, node))
+                path.append(node)
+                features.append(feature)
+
+            # Each split credits its feature with the value change from parent to
+            # child; repeated leaves add zero
+            values = self._node_values(np.stack(path), trees)
+            slots = np.stack(features) + (row_offsets * k + slot_of_tree)
+            contributions[start:start + m] = np.bincount(
+                slots.ravel(), weights=np.diff(values, axis=0).ravel(),
+                minlength=m * k * n_features).reshape(m, k, n_features)
+        return bias, contributions
+
+    def predict_proba(self, X):
+        raw = self.decision_function(X)
+        if self.n_tree_classes == 1:
+            # Binary: one tree per stage, log-odds of the positive class
+            p = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - p, p])
+        raw -= raw.max(axis=1, keepdims=True)
+        np.exp(raw, out=raw)
+        raw /= raw.sum(axis=1, keepdims=True)
+        return raw
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def float32_threshold(threshold):
+    """Largest float32 <= threshold.
+
+    For float32 x, `x <= t` and `x <= float32_threshold(t)` always agree, so the
+    float64 split thresholds can be stored as float32 without changing any split.
+    """
+    t32 = np.asarray(threshold, dtype=np.float64).astype(np.float32)
+    over = t32.astype(np.float64) > threshold
+    t32[over] = np.nextafter(t32[over], np.float32(-np.inf))
+    return t32
+
+
+def is_supported(model):
+    return type(model).__name__ == 'GradientBoostingClassifier' and hasattr(model, 'estimators_')
+
+
+def compile_gradient_boosting(model):
+    """Flatten a fitted GradientBoostingClassifier into a FlatTreeEnsemble."""
+    if not is_supported(model):
+        raise TypeError(f"Cannot compile {type(model).__name__}; only GradientBoostingClassifier is supported")
+
+    n_stages, n_tree_classes = model.estimators_.shape
+    n_features = model.n_features_in_
+    # The prior init estimator gives the same raw score for every row
+    if model.init_ == 'zero':
+        init_raw = np.zeros(n_tree_classes)
+    else:
+        init_raw = model._raw_predict_init(np.zeros((1, n_features), dtype=np.float32))[0]
+
+    features, thresholds, lefts, values, roots = [], [], [], [], []
+    max_depth = 0
+    offset = 0
+    for stage in range(n_stages):
+        for k in range(n_tree_classes):
+            tree = model.estimators_[stage, k].tree_
+            order = _breadth_first(tree)
+            # position of each sklearn node id in the breadth-first order
+            position = np.empty(len(order), dtype=np.int64)
+            position[order] = np.arange(len(order))
+
+            children_left = tree.children_left[order]
+            is_leaf = children_left == -1
+            features.append(np.where(is_leaf, 0, tree.feature[order]))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold[order]))
+            lefts.append(offset + np.where(is_leaf, np.arange(len(order)), position[children_left]))
+            values.append(_expected_values(tree, order, position) * model.learning_rate)
+            roots.append(offset)
+
+            max_depth = max(max_depth, tree.max_depth)
+            offset += len(order)
+
+    return FlatTreeEnsemble(
+        feature=np.concatenate(features).astype(np.int32),
+        threshold=float32_threshold(np.concatenate(thresholds)),
+        left=np.concatenate(lefts).astype(np.int32),
+        value=np.concatenate(values).astype(np.float64),
+        roots=np.asarray(roots, dtype=np.int32),
+        classes=model.classes_,
+        init_raw=init_raw,
+        max_depth=max_depth,
+        n_features=n_features,
+    )
+
+
+def _expected_values(tree, order, position):
+    # Leaf values as fitted. Internal nodes get the sample-weighted mean of the
+    # leaves below them, the expected score of a row reaching the node; sklearn
+    # keeps the mean residual there, which the loss's leaf updates don't touch.
+    # Only explain() reads internal values.
+    value = tree.value[order, 0, 0].astype(np.float64)
+    weight = tree.weighted_n_node_samples[order]
+    left = tree.children_left[order]
+    # Breadth-first order puts children after their parent; fill bottom-up
+    for i in range(len(order) - 1, -1, -1):
+        if left[i] != -1:
+            l = position[left[i]]
+            value[i] = (weight[l] * value[l] + weight[l + 1] * value[l + 1]) / (weight[l] + weight[l + 1])
+    return value
+
+
+def _breadth_first(tree):
+    # sklearn node ids in breadth-first order; siblings end up adjacent
+    order = [0]
+    for node in order:
+        if tree.children_left[node] != -1:
+            order.append(tree.children_left[node])
+            order.append(tree.children_right[node])
+    return np.asarray(order, dtype=np.int64)
+
+
+def source_stamp(model_path):
+    # Identifies the joblib model an export was compiled from
+    st = os.stat(model_path)
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def save_flat(ensemble, path=FLAT_MODEL_DIR, source=None):
+    """Write the node arrays as .npy files plus meta.json.
+
+    `source` is the source_stamp() of the joblib model the arrays were compiled
+    from; model_registry ignores exports whose stamp does not match.
+
+    Readers keep these files memory-mapped, so they are never rewritten in
+    place. Each export goes into a new sibling directory `<path>.<suffix>`,
+    which is synced and then swapped in by atomically replacing the `path`
+    symlink. The export it replaces is kept for readers still loading it;
+    older ones are removed.
+    """
+    path = os.path.normpath(path)
+    parent, base = os.path.split(path)
+    parent = parent or '.'
+    export_dir = os.path.realpath(tempfile.mkdtemp(prefix=f'{base}.', dir=parent))
+    os.chmod(export_dir, 0o755)
+
+    for name in ARRAY_NAMES:
+        with open(os.path.join(export_dir, f'{name}.npy'), 'wb') as f:
+            np.save(f, np.ascontiguousarray(getattr(ensemble, name)))
+            f.flush()
+            os.fsync(f.fileno())
+    meta = {
+        'classes': ensemble.classes_.tolist(),
+        'init_raw': ensemble.init_raw.tolist(),
+        'max_depth': ensemble.max_depth,
+        'n_features': ensemble.n_features,
+        'source': source,
+    }
+    with open(os.path.join(export_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+        f.flush()
+        os.fsync(f.fileno())
+    _fsync_dir(export_dir)
+
+    previous = os.path.realpath(path) if os.path.lexists(path) else None
+    if os.path.isdir(path) and not os.path.islink(path):
+        # A plain directory from an older export: move it aside as the previous export
+        previous = os.path.realpath(tempfile.mkdtemp(prefix=f'{base}.', dir=parent))
+        os.replace(path, previous)
+    link = f'{path}.tmp'
+    if os.path.lexists(link):
+        os.unlink(link)
+    os.symlink(os.path.basename(export_dir), link)
+    os.replace(link, path)
+    _fsync_dir(parent)
+
+    for name in os.listdir(parent):
+        old = os.path.join(parent, name)
+        if (name.startswith(f'{base}.') and os.path.isdir(old) and not os.path.islink(old)
+                and os.path.realpath(old) not in (export_dir, previous)):
+            shutil.rmtree(old, ignore_errors=True)
+    return path
+
+
+def load_flat(path=FLAT_MODEL_DIR, mmap=True):
+    """Load an exported ensemble. With mmap=True the arrays are read-only maps of
+    the files, so worker processes share the same physical pages."""
+    # Resolve the symlink once, so a save_flat() swapping it mid-load can't mix exports
+    path = os.path.realpath(path)
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    mode = 'r' if mmap else None
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mode) for name in ARRAY_NAMES}
+    # Object dtype like sklearn's classes_, so predicted labels are plain str
+    ensemble = FlatTreeEnsemble(classes=np.array(meta['classes'], dtype=object), init_raw=meta['init_raw'],
+                                max_depth=meta['max_depth'], n_features=meta['n_features'], **arrays)
+    ensemble.source = meta['source']
+    return ensemble
+
+
+if __name__ == "__main__":
+    import joblib
+    model = joblib.load('disease_model.joblib')
+    save_flat(compile_gradient_boosting(model), source=source_stamp('disease_model.joblib'))
+    print(f"Flattened model saved in {FLAT_MODEL_DIR}/")